@@ -1,40 +1,108 @@
 import os
+import json
 import threading
 import time
 import shutil
 import cv2
-from flask import Flask, render_template, redirect, url_for, request, flash, Response, session
+from flask import Flask, render_template, redirect, url_for, request, flash, Response, session, send_from_directory, send_file, abort
 
 from config import CONFIG
 from services.db import DB
-from services.camera import Camera
+from services.camera import Camera, SyntheticCamera
 from services.face_recognizer import FaceRecognizer
 from services.emailer import Emailer
-from services.MotionDetector import MotionDetector
+from services.recorder import ClipRecorder
+from services.snapshots import SnapshotStore
+from services.enrollment import EnrollmentManager
+from services.quality import FrameQualityGate
+from services.pipeline import CameraPipeline
+from services.recognition import RecognizerService
+from services.calibration import calibrate
+from services.face_cache import FaceCache
+from services.vision_ipc import VisionServer, RemoteVision, load_authkey
 
 
 app = Flask(__name__)
 app.secret_key = "change-me"
 
 db = DB(CONFIG.DB_PATH)
-camera = Camera(CONFIG.CAMERA_INDEX)
-
-# Global motion detector
-try:
-    motion_detector = MotionDetector(area_threshold=2500)
-    warm = camera.capture_frame()
-    motion_detector.detect(warm)
-    print("Motion detector ready")
-except Exception as e:
-    print("Motion disabled:", e)
-    motion_detector = None
-
-
-recognizer_lock = threading.Lock()
-recognizer = FaceRecognizer(
-    CONFIG.MODEL_PATH,
-    CONFIG.LABELS_PATH,
-    threshold=0.0
+
+
+def _camera_configs():
+    return CONFIG.CAMERAS or [{"id": "door", "index": CONFIG.CAMERA_INDEX}]
+
+
+def _build_pipeline(cfg: dict) -> CameraPipeline:
+    index = cfg.get("index", CONFIG.CAMERA_INDEX)
+    if isinstance(index, str) and index.startswith("synthetic://"):
+        cam = SyntheticCamera(
+            width=cfg.get("width", CONFIG.CAMERA_WIDTH),
+            height=cfg.get("height", CONFIG.CAMERA_HEIGHT),
+            fps=cfg.get("fps", CONFIG.CAMERA_FPS),
+            motion_every_sec=cfg.get("motion_every_sec", 10.0),
+            overlay=cfg.get("overlay"),
+        )
+    else:
+        cam = Camera(
+            index,
+            width=cfg.get("width", CONFIG.CAMERA_WIDTH),
+            height=cfg.get("height", CONFIG.CAMERA_HEIGHT),
+            fps=cfg.get("fps", CONFIG.CAMERA_FPS),
+            fourcc=cfg.get("fourcc", CONFIG.CAMERA_FOURCC),
+            buffer_size=CONFIG.CAMERA_BUFFER_SIZE,
+            grab_latest=CONFIG.CAMERA_GRAB_LATEST,
+            hw_accel=CONFIG.CAMERA_HW_ACCEL,
+        )
+
+    gate = None
+    if CONFIG.QUALITY_GATE_ENABLED:
+        gate = FrameQualityGate(
+            width=CONFIG.QUALITY_WIDTH,
+            min_brightness=CONFIG.QUALITY_MIN_BRIGHTNESS,
+            max_brightness=CONFIG.QUALITY_MAX_BRIGHTNESS,
+            min_sharpness=CONFIG.QUALITY_MIN_SHARPNESS,
+            min_face=CONFIG.QUALITY_MIN_FACE,
+        )
+
+    rec = None
+    if CONFIG.CLIPS_ENABLED:
+        rec = ClipRecorder(
+            cam,
+            CONFIG.CLIPS_DIR,
+            pre_seconds=CONFIG.CLIP_PRE_SEC,
+            post_seconds=CONFIG.CLIP_POST_SEC,
+            fps=CONFIG.CLIP_FPS,
+            scale=CONFIG.CLIP_SCALE,
+            fourcc=CONFIG.CLIP_FOURCC,
+            extension=CONFIG.CLIP_EXTENSION,
+            quota_mb=CONFIG.CLIPS_QUOTA_MB,
+            on_saved=db.set_event_clip,
+            on_evicted=db.clear_clip,
+        )
+
+    return CameraPipeline(str(cfg["id"]), cam, quality_gate=gate, recorder=rec)
+
+
+camera_ids = [str(cfg["id"]) for cfg in _camera_configs()]
+
+# Vision-only objects: one capture/motion pipeline per camera, the
+# enrollment job and the shared recognizer. init_vision() builds them in the
+# process that runs the pipeline, so gunicorn web workers talking to
+# vision.py never load the model or start recognizer threads.
+pipelines = {}
+enrollment = None
+recognition = None
+_vision_lock = threading.Lock()
+
+face_cache = FaceCache(CONFIG.FACE_CACHE_PATH)
+face_cache.seed_persons(CONFIG.FACES_DIR)
+
+snapshots = SnapshotStore(
+    CONFIG.SNAPSHOTS_DIR,
+    thumb_width=CONFIG.SNAPSHOT_THUMB_WIDTH,
+    jpeg_quality=CONFIG.SNAPSHOT_JPEG_QUALITY,
+    quota_mb=CONFIG.SNAPSHOTS_QUOTA_MB,
+    on_evicted=db.clear_snapshot,
 )
 
 emailer = Emailer(
@@ -46,16 +114,48 @@ emailer = Emailer(
     CONFIG.EMAIL_TO,
 )
 
-status_lock = threading.Lock()
-status = {
-    "camera": "standby",
-    "last_result": "N/A",
-    "last_name": None,
-    "last_confidence": None,
-    "note": "",
-}
 
-last_email_sent_ts = 0.0
+def init_vision():
+    global enrollment, recognition
+    if recognition is not None:
+        return
+    with _vision_lock:
+        if recognition is not None:
+            return
+
+        for cfg in _camera_configs():
+            pipe = _build_pipeline(cfg)
+            pipelines[pipe.id] = pipe
+
+        enrollment = EnrollmentManager(
+            pipelines[camera_ids[0]].camera,
+            CONFIG.FACES_DIR,
+            roi_size=CONFIG.ENROLL_ROI_SIZE,
+            min_sharpness=CONFIG.ENROLL_MIN_SHARPNESS,
+            min_symmetry=CONFIG.ENROLL_MIN_SYMMETRY,
+            dup_distance=CONFIG.ENROLL_DUP_DISTANCE,
+            cache=face_cache,
+        )
+
+        # Shared by every camera and manual trigger; face ROIs are classified in batches.
+        recognition = RecognizerService(
+            CONFIG.MODEL_PATH,
+            CONFIG.LABELS_PATH,
+            threshold=CONFIG.DEFAULT_THRESHOLD,
+            thresholds_path=CONFIG.THRESHOLDS_PATH,
+            max_batch=CONFIG.RECOGNITION_MAX_BATCH,
+            max_wait_ms=CONFIG.RECOGNITION_MAX_WAIT_MS,
+            workers=CONFIG.RECOGNITION_WORKERS,
+        )
+
+
+def get_pipeline(camera_id=None) -> CameraPipeline:
+    if not camera_id:
+        return pipelines[camera_ids[0]]
+    pipe = pipelines.get(camera_id)
+    if pipe is None:
+        raise ValueError(f"Unknown camera: {camera_id}")
+    return pipe
 
 
 def get_threshold() -> float:
@@ -66,6 +166,62 @@ def get_threshold() -> float:
         return CONFIG.DEFAULT_THRESHOLD
 
 
+def load_calibration():
+    if not os.path.exists(CONFIG.THRESHOLDS_PATH):
+        return None
+    try:
+        with open(CONFIG.THRESHOLDS_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _remove_model_files():
+    for path in (CONFIG.MODEL_PATH, CONFIG.LABELS_PATH, CONFIG.THRESHOLDS_PATH):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception:
+            pass
+
+
+_calibration_lock = threading.Lock()
+
+
+def _run_calibration(target_far: float, set_global: bool = False, refresh: bool = False):
+    # Calibration cost grows with the square of the sample count, so it runs
+    # on a background thread and reloads the recognizer when it is done.
+    with _calibration_lock:
+        try:
+            res = calibrate(CONFIG.MODEL_PATH, CONFIG.LABELS_PATH, CONFIG.THRESHOLDS_PATH, target_far)
+            if set_global and res["global"] is not None:
+                db.set_setting("threshold", f"{res['global']:.2f}")
+        except Exception as e:
+            db.add_event(name=None, result="CALIBRATION_FAIL", confidence=None, note=str(e))
+            if refresh:
+                # Thresholds from the previous model no longer apply.
+                try:
+                    os.remove(CONFIG.THRESHOLDS_PATH)
+                except Exception:
+                    pass
+        try:
+            vision.reload_recognizer()
+        except Exception:
+            pass
+
+
+def start_calibration(target_far: float, set_global: bool = False, refresh: bool = False):
+    threading.Thread(target=_run_calibration, args=(target_far, set_global, refresh), daemon=True).start()
+
+
+def _refresh_calibration():
+    # Retraining changes the histograms, so redo an existing calibration.
+    current = load_calibration()
+    if current is None:
+        return
+    start_calibration(current.get("target_far", CONFIG.CALIBRATION_TARGET_FAR), refresh=True)
+
+
 def get_notifications_enabled() -> bool:
     v = db.get_setting("email_enabled", "1" if CONFIG.EMAIL_ENABLED_DEFAULT else "0")
     return v == "1"
@@ -103,9 +259,18 @@ def set_notify_email(email: str):
     db.set_setting("notify_email", (email or "").strip())
 
 
-def _maybe_encode_frame_jpg(frame):
+def _save_snapshot(frame):
+    try:
+        return snapshots.save(frame)
+    except Exception:
+        return None, None
+
+
+def _maybe_encode_frame_jpg(frame, jpg_bytes=None):
     if not get_attach_photo():
         return None
+    if jpg_bytes is not None:
+        return jpg_bytes
     try:
         ok, buf = cv2.imencode(".jpg", frame)
         if ok:
@@ -115,17 +280,15 @@ def _maybe_encode_frame_jpg(frame):
     return None
 
 
-def _can_send_email(now_ts: float) -> bool:
-    global last_email_sent_ts
+def _can_send_email(pipe: CameraPipeline, now_ts: float) -> bool:
     cooldown = get_email_cooldown_sec()
     if cooldown == 0:
         return True
-    return (now_ts - last_email_sent_ts) >= cooldown
+    return (now_ts - pipe.last_email_sent_ts) >= cooldown
 
 
-def _mark_email_sent(now_ts: float):
-    global last_email_sent_ts
-    last_email_sent_ts = now_ts
+def _mark_email_sent(pipe: CameraPipeline, now_ts: float):
+    pipe.last_email_sent_ts = now_ts
 
 
 def _make_emailer_for_current_recipient() -> Emailer:
@@ -138,131 +301,187 @@ def _make_emailer_for_current_recipient() -> Emailer:
         CONFIG.SMTP_PASSWORD,
         from_email,
         to_email,
+        use_tls=CONFIG.SMTP_STARTTLS,
     )
 
 
-def process_one_attempt(source: str = "manual", frame=None):
-    global status
-
-    with status_lock:
-        status["camera"] = "capturing"
-        status["note"] = f"Triggered by {source}"
+def process_one_attempt(pipe: CameraPipeline, source: str = "manual", frame=None, face=None):
+    pipe.set_status(camera="capturing", note=f"Triggered by {source}")
 
     try:
         if frame is None:
-            frame = camera.capture_frame()
+            frame = pipe.camera.capture_frame()
 
-        with recognizer_lock:
-            recognizer.set_threshold(get_threshold())
-            result, name, confidence, note = recognizer.detect_and_recognize(frame)
+        result, name, confidence, note = recognition.recognize(frame, get_threshold(), face=face)
 
-        if result == "GRANTED":
-            db.add_event(name=name, result="GRANTED", confidence=confidence, note=note)
-        elif result == "DENIED":
-            db.add_event(name=name, result="DENIED", confidence=confidence, note=note)
+        snapshot_key, snapshot_jpg = None, None
+        if result in ("GRANTED", "DENIED"):
+            snapshot_key, snapshot_jpg = _save_snapshot(frame)
+            event_id = db.add_event(
+                name=name, result=result, confidence=confidence, note=note,
+                snapshot=snapshot_key, camera=pipe.id
+            )
+            if pipe.recorder is not None:
+                pipe.recorder.trigger(event_id, result)
         else:
-            db.add_event(name=None, result="NO_FACE", confidence=None, note=note)
+            db.add_event(name=None, result="NO_FACE", confidence=None, note=note, camera=pipe.id)
 
         if get_notifications_enabled():
             if not get_notify_email():
-                db.add_event(name=name, result="EMAIL_SKIP", confidence=confidence, note="No notify_email set")
+                db.add_event(name=name, result="EMAIL_SKIP", confidence=confidence, note="No notify_email set", camera=pipe.id)
             else:
-                now = time.time()
-                if _can_send_email(now):
-                    image_bytes = _maybe_encode_frame_jpg(frame)
-                    try:
-                        emailer_local = _make_emailer_for_current_recipient()
-
-                        if result == "DENIED":
-                            emailer_local.send_access_denied(
-                                f"Access denied.\nName guess: {name}\nConfidence: {confidence}\nNote: {note}",
-                                image_jpg_bytes=image_bytes,
-                            )
-                            _mark_email_sent(now)
-
-                        elif result == "GRANTED" and get_email_on_granted():
-                            emailer_local.send_access_granted(
-                                f"Access granted.\nName: {name}\nConfidence: {confidence}\nNote: {note}",
-                                image_jpg_bytes=image_bytes,
-                            )
-                            _mark_email_sent(now)
-
-                    except Exception as e:
-                        db.add_event(name=name, result="EMAIL_FAIL", confidence=confidence, note=str(e))
-
-        with status_lock:
-            status["last_result"] = result
-            status["last_name"] = name
-            status["last_confidence"] = confidence
-            status["note"] = note
+                with pipe.email_lock:
+                    now = time.time()
+                    if _can_send_email(pipe, now):
+                        image_bytes = _maybe_encode_frame_jpg(frame, snapshot_jpg)
+                        try:
+                            emailer_local = _make_emailer_for_current_recipient()
+
+                            if result == "DENIED":
+                                emailer_local.send_access_denied(
+                                    f"Access denied.\nCamera: {pipe.id}\nName guess: {name}\nConfidence: {confidence}\nNote: {note}",
+                                    image_jpg_bytes=image_bytes,
+                                )
+                                _mark_email_sent(pipe, now)
+
+                            elif result == "GRANTED" and get_email_on_granted():
+                                emailer_local.send_access_granted(
+                                    f"Access granted.\nCamera: {pipe.id}\nName: {name}\nConfidence: {confidence}\nNote: {note}",
+                                    image_jpg_bytes=image_bytes,
+                                )
+                                _mark_email_sent(pipe, now)
+
+                        except Exception as e:
+                            db.add_event(name=name, result="EMAIL_FAIL", confidence=confidence, note=str(e), camera=pipe.id)
+
+        pipe.set_status(last_result=result, last_name=name, last_confidence=confidence, note=note)
 
     except Exception as e:
-        db.add_event(name=None, result="ERROR", confidence=None, note=str(e))
-        with status_lock:
-            status["last_result"] = "ERROR"
-            status["note"] = str(e)
+        db.add_event(name=None, result="ERROR", confidence=None, note=str(e), camera=pipe.id)
+        pipe.set_status(last_result="ERROR", note=str(e))
     finally:
-        with status_lock:
-            status["camera"] = "standby"
+        pipe.set_status(camera="standby")
 
 
-def motion_loop():
-    global motion_detector
-
-    print("Motion detection loop started")
-    if motion_detector is None:
-        print("Motion detector disabled")
+def motion_loop(pipe: CameraPipeline):
+    print(f"Motion detection loop started ({pipe.id})")
+    if pipe.motion_detector is None:
+        print(f"Motion detector disabled ({pipe.id})")
         return
 
+    last_seq = None
+    # After motion, keep looking at fresh frames until one passes the
+    # quality gate or the defer window runs out.
+    defer_until = None
     while True:
         try:
-            frame = camera.capture_frame()
+            frame, last_seq = pipe.camera.capture_next(last_seq)
+            now = time.time()
+
+            if pipe.motion_detector.detect(frame) and defer_until is None:
+                defer_until = now + CONFIG.QUALITY_DEFER_SEC
 
-            if motion_detector.detect(frame):
-                process_one_attempt(source="MOTION", frame=frame)
+            if defer_until is None:
+                time.sleep(0.1)
+                continue
+
+            ok, face = True, None
+            if pipe.quality_gate is not None:
+                ok, _, face = pipe.quality_gate.check(frame)
+
+            if ok:
+                defer_until = None
+                process_one_attempt(pipe, source="MOTION", frame=frame, face=face)
                 time.sleep(2.0)
-            else:
+            elif now >= defer_until:
+                defer_until = None
+                pipe.quality_gate.count("expired")
                 time.sleep(0.1)
 
         except Exception as e:
-            db.add_event(name=None, result="MOTION_ERROR", confidence=None, note=str(e))
+            db.add_event(name=None, result="MOTION_ERROR", confidence=None, note=str(e), camera=pipe.id)
             time.sleep(1.0)
 
 
-def capture_samples(person_name: str, num_samples: int):
-    person_name = person_name.strip()
-    if not person_name:
-        raise ValueError("Person name required")
+def _rss_mb():
+    # Current resident set size; only available where /proc exists.
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except Exception:
+        return None
 
-    save_dir = os.path.join(CONFIG.FACES_DIR, person_name)
-    os.makedirs(save_dir, exist_ok=True)
 
-    face_cascade = cv2.CascadeClassifier(
-        cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-    )
+def get_metrics() -> dict:
+    init_vision()
+    return {
+        "process": {"rss_mb": _rss_mb(), "threads": threading.active_count()},
+        "recognition": recognition.metrics(),
+        "quality": {
+            pipe.id: pipe.quality_gate.metrics() if pipe.quality_gate is not None else None
+            for pipe in pipelines.values()
+        },
+    }
+
+
+def get_status() -> dict:
+    # Top-level fields mirror the camera with the most recent activity.
+    init_vision()
+    cameras = {pipe.id: pipe.get_status() for pipe in pipelines.values()}
+    latest_id = max(cameras, key=lambda cid: cameras[cid]["updated"])
+    st = dict(cameras[latest_id])
+    st["camera_id"] = latest_id
+    st["cameras"] = cameras
+    st["enrollment"] = enrollment.status()
+    return st
+
 
-    saved = 0
-    attempts = 0
+def start_attempt(source: str = "MANUAL", camera_id=None):
+    init_vision()
+    pipe = get_pipeline(camera_id)
+    threading.Thread(target=process_one_attempt, args=(pipe, source), daemon=True).start()
 
-    while saved < num_samples and attempts < num_samples * 8:
-        attempts += 1
-        frame = camera.capture_frame()
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.2, 5, minSize=(80, 80))
-        if len(faces) == 0:
-            time.sleep(0.08)
-            continue
-        faces = sorted(faces, key=lambda r: r[2] * r[3], reverse=True)
-        x, y, w, h = faces[0]
-        roi = gray[y:y + h, x:x + w]
-        cv2.imwrite(os.path.join(save_dir, f"{int(time.time()*1000)}_{saved}.jpg"), roi)
-        saved += 1
-        time.sleep(0.08)
 
-    if saved == 0:
-        raise RuntimeError("No face samples captured")
+def reload_recognizer():
+    init_vision()
+    recognition.reload(get_threshold())
 
-    return saved
+
+def latest_preview_jpeg(after_seq=None, camera_id=None):
+    init_vision()
+    return get_pipeline(camera_id).latest_preview_jpeg(after_seq)
+
+
+def start_enrollment(person_name: str, num_samples: int, camera_id=None):
+    init_vision()
+    return enrollment.start(person_name, num_samples, camera=get_pipeline(camera_id).camera)
+
+
+class LocalVision:
+    # In-process vision pipeline; RemoteVision exposes the same methods
+    # when the pipeline runs in a separate process (see vision.py).
+    get_status = staticmethod(get_status)
+    get_metrics = staticmethod(get_metrics)
+    trigger = staticmethod(start_attempt)
+    latest_preview_jpeg = staticmethod(latest_preview_jpeg)
+    reload_recognizer = staticmethod(reload_recognizer)
+    start_enrollment = staticmethod(start_enrollment)
+
+
+vision = LocalVision()
+
+
+def use_remote_vision():
+    global vision
+    authkey = load_authkey(CONFIG.VISION_AUTHKEY_PATH, CONFIG.VISION_AUTHKEY)
+    vision = RemoteVision(CONFIG.VISION_HOST, CONFIG.VISION_PORT, authkey)
+
+
+def serve_vision():
+    init_vision()
+    authkey = load_authkey(CONFIG.VISION_AUTHKEY_PATH, CONFIG.VISION_AUTHKEY)
+    VisionServer(LocalVision(), CONFIG.VISION_HOST, CONFIG.VISION_PORT, authkey).serve_forever()
 
 
 @app.route("/login", methods=["GET", "POST"])
@@ -297,48 +516,44 @@ def index():
         return redirect(url_for("login"))
 
     events = db.latest_events(30)
-    with status_lock:
-        st = dict(status)
-
-    persons = []
-    if os.path.isdir(CONFIG.FACES_DIR):
-        persons = sorted(
-            d for d in os.listdir(CONFIG.FACES_DIR)
-            if os.path.isdir(os.path.join(CONFIG.FACES_DIR, d))
-        )
+    st = vision.get_status()
+
+    persons = face_cache.persons()
 
-    return render_template("index.html", status=st, events=events, persons=persons)
+    return render_template("index.html", status=st, events=events, persons=persons, cameras=camera_ids)
 
 
 @app.route("/trigger", methods=["POST"])
 def trigger():
-    threading.Thread(target=process_one_attempt, args=("MANUAL",), daemon=True).start()
-    flash("Started recognition attempt.")
+    try:
+        vision.trigger("MANUAL", request.form.get("camera") or None)
+        flash("Started recognition attempt.")
+    except Exception as e:
+        flash(f"Trigger failed: {e}")
     return redirect(url_for("index"))
 
 @app.route("/status_json")
 def status_json():
-    with status_lock:
-        return {
-            "status": status,
-            "events": db.latest_events(10)
-        }
+    return {
+        "status": vision.get_status(),
+        "events": db.latest_events(10)
+    }
+
+@app.route("/metrics")
+def metrics():
+    return vision.get_metrics()
 
 @app.route("/train", methods=["POST"])
 def train():
-    global recognizer
     try:
-        with recognizer_lock:
-            total, used = FaceRecognizer.train_from_folder(
-                CONFIG.FACES_DIR,
-                CONFIG.MODEL_PATH,
-                CONFIG.LABELS_PATH
-            )
-            recognizer = FaceRecognizer(
-                CONFIG.MODEL_PATH,
-                CONFIG.LABELS_PATH,
-                threshold=get_threshold()
-            )
+        total, used = FaceRecognizer.train_from_folder(
+            CONFIG.FACES_DIR,
+            CONFIG.MODEL_PATH,
+            CONFIG.LABELS_PATH,
+            cache=face_cache,
+        )
+        vision.reload_recognizer()
+        _refresh_calibration()
         flash(f"Training complete. Images: {total}, Faces used: {used}.")
     except Exception as e:
         flash(f"Training failed: {e}")
@@ -347,8 +562,6 @@ def train():
 
 @app.route("/delete_person", methods=["POST"])
 def delete_person():
-    global recognizer
-
     person = request.form.get("person", "").strip()
     if not person:
         flash("No person specified.")
@@ -361,6 +574,7 @@ def delete_person():
 
     try:
         shutil.rmtree(person_dir)
+        face_cache.delete_person(person)
 
         remaining = []
         if os.path.isdir(CONFIG.FACES_DIR):
@@ -370,20 +584,9 @@ def delete_person():
             ]
 
         if len(remaining) == 0:
-            try:
-                if os.path.exists(CONFIG.MODEL_PATH):
-                    os.remove(CONFIG.MODEL_PATH)
-                if os.path.exists(CONFIG.LABELS_PATH):
-                    os.remove(CONFIG.LABELS_PATH)
-            except Exception:
-                pass
-
-            with recognizer_lock:
-                recognizer = FaceRecognizer(
-                    CONFIG.MODEL_PATH,
-                    CONFIG.LABELS_PATH,
-                    threshold=get_threshold()
-                )
+            _remove_model_files()
+
+            vision.reload_recognizer()
 
             flash(f"Person '{person}' deleted. No persons left, model cleared.")
             return redirect(url_for("index"))
@@ -391,15 +594,12 @@ def delete_person():
         total, used = FaceRecognizer.train_from_folder(
             CONFIG.FACES_DIR,
             CONFIG.MODEL_PATH,
-            CONFIG.LABELS_PATH
+            CONFIG.LABELS_PATH,
+            cache=face_cache,
         )
 
-        with recognizer_lock:
-            recognizer = FaceRecognizer(
-                CONFIG.MODEL_PATH,
-                CONFIG.LABELS_PATH,
-                threshold=get_threshold()
-            )
+        vision.reload_recognizer()
+        _refresh_calibration()
 
         flash(f"Person '{person}' deleted. Model retrained (images: {total}, faces used: {used}).")
 
@@ -419,29 +619,29 @@ def capture():
         n = 20
 
     try:
-        saved = capture_samples(person, max(5, min(60, n)))
-        flash(f"Captured {saved} samples for {person}.")
+        vision.start_enrollment(person, max(5, min(60, n)), request.form.get("camera") or None)
+        flash(f"Capturing samples for {person} in the background.")
     except Exception as e:
         flash(f"Capture failed: {e}")
     return redirect(url_for("index"))
 
 
-def gen_frames():
+def gen_frames(camera_id=None):
+    last_seq = None
     while True:
         try:
-            frame = camera.capture_frame()
-            ok, buffer = cv2.imencode(".jpg", frame)
-            if not ok:
-                time.sleep(0.05)
-                continue
-            yield b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + buffer.tobytes() + b"\r\n"
+            jpg, last_seq = vision.latest_preview_jpeg(last_seq, camera_id)
+            yield b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpg + b"\r\n"
         except Exception:
             time.sleep(0.2)
 
 
 @app.route("/preview")
 def preview():
-    return Response(gen_frames(), mimetype="multipart/x-mixed-replace; boundary=frame")
+    camera_id = request.args.get("camera") or None
+    if camera_id is not None and camera_id not in camera_ids:
+        abort(404)
+    return Response(gen_frames(camera_id), mimetype="multipart/x-mixed-replace; boundary=frame")
 
 
 @app.route("/settings", methods=["GET", "POST"])
@@ -475,42 +675,76 @@ def settings():
         email_on_granted=email_on_granted,
         attach_photo=attach_photo,
         email_cooldown_sec=email_cooldown_sec,
+        calibration=load_calibration(),
+        target_far_pct=CONFIG.CALIBRATION_TARGET_FAR * 100,
     )
 
 
+@app.route("/clips/<path:filename>")
+def clip(filename):
+    if not CONFIG.CLIPS_ENABLED:
+        abort(404)
+    return send_from_directory(CONFIG.CLIPS_DIR, filename)
+
+
+@app.route("/snapshots/<key>")
+def snapshot(key):
+    size = "thumb" if request.args.get("size") == "thumb" else "full"
+    path = snapshots.path_for(key, size)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    # Content-addressed: the key never changes meaning, so clients may cache forever.
+    resp = send_file(path, mimetype="image/jpeg", etag=f"{key}-{size}", conditional=True, max_age=31536000)
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
+
+
 def start_background_threads():
-    threading.Thread(target=motion_loop, daemon=True).start()
+    init_vision()
+    for pipe in pipelines.values():
+        pipe.warm_up()
+        if pipe.recorder is not None:
+            pipe.recorder.start()
+        threading.Thread(target=motion_loop, args=(pipe,), daemon=True).start()
 
 @app.route("/reset_model", methods=["POST"])
 def reset_model():
-    global recognizer
     try:
-        try:
-            if os.path.exists(CONFIG.MODEL_PATH):
-                os.remove(CONFIG.MODEL_PATH)
-            if os.path.exists(CONFIG.LABELS_PATH):
-                os.remove(CONFIG.LABELS_PATH)
-        except Exception:
-            pass
+        _remove_model_files()
 
-        with recognizer_lock:
-            recognizer = FaceRecognizer(
-                CONFIG.MODEL_PATH,
-                CONFIG.LABELS_PATH,
-                threshold=get_threshold()
-            )
+        vision.reload_recognizer()
 
-        flash("Model reset: lbph.yml and labels.json cleared.")
+        flash("Model reset: lbph.yml, labels.json and thresholds.json cleared.")
     except Exception as e:
         flash(f"Reset model failed: {e}")
 
     return redirect(url_for("settings"))
 
 
+@app.route("/calibrate", methods=["POST"])
+def calibrate_thresholds():
+    far_raw = request.form.get("target_far_pct", str(CONFIG.CALIBRATION_TARGET_FAR * 100)).strip()
+    try:
+        target_far = max(0.0, min(50.0, float(far_raw))) / 100.0
+    except Exception:
+        target_far = CONFIG.CALIBRATION_TARGET_FAR
+
+    if not os.path.exists(CONFIG.MODEL_PATH) or not os.path.exists(CONFIG.LABELS_PATH):
+        flash("Calibration failed: Model not trained yet")
+    else:
+        start_calibration(target_far, set_global=True)
+        flash("Calibration started. Thresholds update when it finishes.")
+
+    return redirect(url_for("settings"))
+
+
 @app.route("/clear_events", methods=["POST"])
 def clear_events():
     try:
         db.clear_events()
+        snapshots.prune(db.snapshot_keys())
         flash("All events cleared.")
     except Exception as e:
         flash(f"Clear events failed: {e}")
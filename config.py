@@ -1,5 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import List
 
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -8,10 +9,68 @@ class Config:
     DB_PATH: str = str(BASE_DIR / "data" / "smartdoor.db")
     MODEL_PATH: str = str(BASE_DIR / "data" / "models" / "lbph.yml")
     LABELS_PATH: str = str(BASE_DIR / "data" / "models" / "labels.json")
+    FACE_CACHE_PATH: str = str(BASE_DIR / "data" / "models" / "face_cache.db")
+    THRESHOLDS_PATH: str = str(BASE_DIR / "data" / "models" / "thresholds.json")
     FACES_DIR: str = str(BASE_DIR / "data" / "faces")
     LOG_PATH: str = str(BASE_DIR / "logs" / "smartdoor.log")
+    CLIPS_DIR: str = str(BASE_DIR / "data" / "clips")
+    SNAPSHOTS_DIR: str = str(BASE_DIR / "data" / "snapshots")
 
     CAMERA_INDEX: int = 0
+    # One entry per door, e.g. {"id": "front", "index": 0} or
+    # {"id": "back", "index": "rtsp://..."}; "width", "height", "fps" and
+    # "fourcc" override the CAMERA_* defaults. Empty means CAMERA_INDEX only.
+    CAMERAS: List[dict] = field(default_factory=list)
+    # 0 / "" keep the device default.
+    CAMERA_WIDTH: int = 640
+    CAMERA_HEIGHT: int = 480
+    CAMERA_FPS: int = 30
+    CAMERA_FOURCC: str = "MJPG"
+    CAMERA_BUFFER_SIZE: int = 1
+    CAMERA_GRAB_LATEST: bool = True
+    # Hardware decoding through the FFmpeg backend; only applies to stream URL
+    # and file sources. USB device indexes open through V4L2, which has no
+    # hardware decode path. Camera.info() reports whether it took effect.
+    CAMERA_HW_ACCEL: bool = False
+
+    CLIPS_ENABLED: bool = True
+    CLIP_PRE_SEC: float = 4.0
+    CLIP_POST_SEC: float = 3.0
+    CLIP_FPS: float = 10.0
+    CLIP_SCALE: float = 0.5
+    # VP8/WebM plays inline in browsers; mp4v/.mp4 does not.
+    CLIP_FOURCC: str = "VP80"
+    CLIP_EXTENSION: str = ".webm"
+    CLIPS_QUOTA_MB: float = 500.0
+
+    SNAPSHOT_THUMB_WIDTH: int = 160
+    SNAPSHOT_JPEG_QUALITY: int = 85
+    SNAPSHOTS_QUOTA_MB: float = 200.0
+
+    ENROLL_ROI_SIZE: int = 200
+    ENROLL_MIN_SHARPNESS: float = 60.0
+    ENROLL_MIN_SYMMETRY: float = 0.5
+    ENROLL_DUP_DISTANCE: int = 6
+
+    # Cheap checks on a downscaled frame before motion-triggered recognition.
+    QUALITY_GATE_ENABLED: bool = True
+    QUALITY_WIDTH: int = 320
+    QUALITY_MIN_BRIGHTNESS: float = 40.0
+    QUALITY_MAX_BRIGHTNESS: float = 220.0
+    QUALITY_MIN_SHARPNESS: float = 30.0
+    QUALITY_MIN_FACE: int = 80
+    QUALITY_DEFER_SEC: float = 1.5
+
+    RECOGNITION_MAX_BATCH: int = 8
+    RECOGNITION_MAX_WAIT_MS: float = 15.0
+    RECOGNITION_WORKERS: int = 2
+
+    # Production mode: vision.py serves the pipeline here, wsgi.py connects.
+    VISION_HOST: str = "127.0.0.1"
+    VISION_PORT: int = 5055
+    # Empty: both sides share a random key generated in VISION_AUTHKEY_PATH.
+    VISION_AUTHKEY: str = ""
+    VISION_AUTHKEY_PATH: str = str(BASE_DIR / "data" / "vision.key")
 
     PIR_ENABLED: bool = False
     PIR_GPIO_PIN: int = 17
@@ -23,8 +82,10 @@ class Config:
     SMTP_PORT: int = 587
     SMTP_USERNAME: str = "youremail@gmail.com"
     SMTP_PASSWORD: str = "your_app_password"
+    SMTP_STARTTLS: bool = True
 
     DEFAULT_THRESHOLD: float = 60.0
+    CALIBRATION_TARGET_FAR: float = 0.01
 
 CONFIG = Config()
 
@@ -0,0 +1,561 @@
+# Load and soak test for the web endpoints.
+#
+# Starts the app in a child process with synthetic cameras and a stub SMTP
+# server, then drives concurrent dashboards (/ and /status_json), preview
+# streams (/preview) and manual triggers (/trigger) while the synthetic
+# cameras generate motion. Writes a JSON report that can be compared
+# between versions.
+#
+# Without --overlay the synthetic cameras show textured stand-in faces: two
+# enrolled persons and a stranger. Face detection is stubbed to find them, so
+# GRANTED/DENIED decisions, snapshots, clips and emails all happen under load.
+#
+#   python loadtest.py --duration 600 --out report.json
+#   python loadtest.py --overlay face.jpg          # real face photo, real Haar detection
+#   python loadtest.py --url http://pi:5000        # against a running deployment
+#   python loadtest.py --compare old.json new.json
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import socketserver
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    v = sorted(values)
+
+    def pick(q):
+        return round(v[min(len(v) - 1, int(q * len(v)))], 1)
+
+    return {"p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99), "max": round(v[-1], 1)}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# --- stub SMTP ---------------------------------------------------------------
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line: str):
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self):
+        self._reply("220 loadtest ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode("ascii", "replace").strip().upper()
+            if cmd.startswith(("EHLO", "HELO")):
+                self.wfile.write(b"250-loadtest\r\n250 AUTH PLAIN LOGIN\r\n")
+            elif cmd.startswith("AUTH"):
+                self._reply("235 Authentication successful")
+            elif cmd.startswith("DATA"):
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self._reply("250 OK")
+            elif cmd.startswith("QUIT"):
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("250 OK")
+
+
+class StubSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int):
+        super().__init__(("127.0.0.1", port), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.messages = 0
+
+
+# --- synthetic faces (child process) ------------------------------------------
+
+SYNTHETIC_PERSONS = ("resident", "neighbour")
+SYNTHETIC_THRESHOLD = 25.0
+
+
+def synthetic_faces(size: int, workdir: str, faces_dir: str, model_path: str, labels_path: str):
+    # Smooth random textures stand in for faces. Enrolled persons get a few
+    # shifted crops each and a trained model; the stranger is not enrolled.
+    # Returns the overlay images in the order the cameras should show them.
+    import cv2
+    import numpy as np
+
+    from services.face_recognizer import FACE_CROP_SUFFIX, FaceRecognizer
+
+    rng = np.random.default_rng(7)
+    pad = 8
+    overlays = []
+    for name in ("resident", "stranger", "neighbour"):
+        tex = cv2.GaussianBlur(rng.random((size + pad, size + pad)).astype(np.float32), (0, 0), 5)
+        tex = cv2.normalize(tex, None, 140, 255, cv2.NORM_MINMAX).astype(np.uint8)
+
+        if name in SYNTHETIC_PERSONS:
+            person_dir = os.path.join(faces_dir, name)
+            os.makedirs(person_dir, exist_ok=True)
+            for k, (dx, dy) in enumerate([(0, 0), (pad, 0), (0, pad), (pad, pad), (pad // 2, pad // 2), (2, 6)]):
+                cv2.imwrite(os.path.join(person_dir, f"{k}{FACE_CROP_SUFFIX}"), tex[dy:dy + size, dx:dx + size])
+
+        path = os.path.join(workdir, f"{name}.png")
+        cv2.imwrite(path, tex[pad // 2:pad // 2 + size, pad // 2:pad // 2 + size])
+        overlays.append(path)
+
+    FaceRecognizer.train_from_folder(faces_dir, model_path, labels_path)
+    return overlays
+
+
+def locate_overlay(frame, size: int):
+    # The synthetic camera draws the overlay as a size x size square centred
+    # vertically on a flat background; find the columns it covers.
+    import numpy as np
+
+    y = (frame.shape[0] - size) // 2
+    band = frame[y:y + size].astype(np.int16)
+    background = frame[-1, 0].astype(np.int16)
+    cols = (np.abs(band - background).max(axis=2) > 25).mean(axis=0) > 0.5
+    if cols.sum() < size // 2:
+        return None
+    xs = np.flatnonzero(cols)
+    return int(xs[0]), y, int(xs[-1] - xs[0] + 1), size
+
+
+class SyntheticFaceGate:
+    # Stands in for FrameQualityGate: Haar does not see the textures as faces.
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._counts = {"checked": 0, "passed": 0, "expired": 0, "skipped_no_face": 0}
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def check(self, frame):
+        self.count("checked")
+        face = locate_overlay(frame, self.size)
+        if face is None:
+            self.count("skipped_no_face")
+            return False, "no_face", None
+        self.count("passed")
+        return True, None, face
+
+
+def install_synthetic_detection(smartdoor, size: int):
+    smartdoor.init_vision()
+    for pipe in smartdoor.pipelines.values():
+        pipe.quality_gate = SyntheticFaceGate(size)
+
+    # Manual triggers carry no face rectangle; locate the overlay instead of Haar.
+    recognize = smartdoor.recognition.recognize
+
+    def recognize_synthetic(frame, threshold, face=None):
+        if face is None:
+            face = locate_overlay(frame, size)
+        return recognize(frame, threshold, face=face)
+
+    smartdoor.recognition.recognize = recognize_synthetic
+
+
+# --- app under test (child process) ------------------------------------------
+
+def serve(args):
+    from config import CONFIG
+
+    work = args.workdir
+    CONFIG.DB_PATH = os.path.join(work, "smartdoor.db")
+    CONFIG.MODEL_PATH = os.path.join(work, "models", "lbph.yml")
+    CONFIG.LABELS_PATH = os.path.join(work, "models", "labels.json")
+    CONFIG.THRESHOLDS_PATH = os.path.join(work, "models", "thresholds.json")
+    CONFIG.FACE_CACHE_PATH = os.path.join(work, "models", "face_cache.db")
+    CONFIG.FACES_DIR = os.path.join(work, "faces")
+    CONFIG.CLIPS_DIR = os.path.join(work, "clips")
+    CONFIG.SNAPSHOTS_DIR = os.path.join(work, "snapshots")
+
+    size = (CONFIG.CAMERA_HEIGHT or 480) // 2
+    if args.overlay:
+        overlays = [args.overlay]
+    else:
+        overlays = synthetic_faces(size, work, CONFIG.FACES_DIR, CONFIG.MODEL_PATH, CONFIG.LABELS_PATH)
+    CONFIG.CAMERAS = [
+        {
+            "id": f"cam{i}",
+            "index": "synthetic://",
+            "motion_every_sec": args.motion_every,
+            "overlay": overlays[i % len(overlays):] + overlays[:i % len(overlays)],
+        }
+        for i in range(args.cameras)
+    ]
+    CONFIG.SMTP_HOST = "127.0.0.1"
+    CONFIG.SMTP_PORT = args.smtp_port
+    CONFIG.SMTP_STARTTLS = False
+
+    import app as smartdoor
+
+    smartdoor.db.set_setting("notify_email", "loadtest@example.com")
+    smartdoor.db.set_setting("email_cooldown_sec", "0")
+    smartdoor.db.set_setting("email_enabled", "1")
+    smartdoor.db.set_setting("email_on_granted", "1")
+    if not args.overlay:
+        smartdoor.db.set_setting("threshold", str(SYNTHETIC_THRESHOLD))
+        install_synthetic_detection(smartdoor, size)
+    smartdoor.start_background_threads()
+    smartdoor.app.run(host="127.0.0.1", port=args.port, threaded=True, debug=False, use_reloader=False)
+
+
+# --- clients -----------------------------------------------------------------
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {}
+        self.errors = {}
+
+    def add(self, name: str, ms: float, ok: bool):
+        with self.lock:
+            self.latency.setdefault(name, []).append(ms)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def request(base: str, method: str, path: str, body=None, timeout: float = 30.0):
+    u = urllib.parse.urlsplit(base)
+    conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=timeout)
+    headers = {}
+    if body is not None:
+        body = urllib.parse.urlencode(body)
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    started = time.perf_counter()
+    try:
+        conn.request(method, path, body=body, headers=headers)
+        resp = conn.getresponse()
+        data = resp.read()
+        return resp.status, (time.perf_counter() - started) * 1000.0, data
+    finally:
+        conn.close()
+
+
+def timed(stats: Stats, name: str, base: str, method: str, path: str, body=None):
+    try:
+        status, ms, data = request(base, method, path, body)
+        stats.add(name, ms, status < 400)
+        return data if status < 400 else None
+    except Exception:
+        stats.add(name, 30000.0, False)
+        return None
+
+
+def dashboard_client(base, stop, stats, interval):
+    # Mirrors the page: one full load, then /status_json polling.
+    timed(stats, "GET /", base, "GET", "/")
+    while not stop.wait(interval):
+        timed(stats, "GET /status_json", base, "GET", "/status_json")
+
+
+def trigger_client(base, stop, stats, interval, cameras):
+    i = 0
+    while not stop.wait(interval):
+        body = {"camera": cameras[i % len(cameras)]} if cameras else {}
+        timed(stats, "POST /trigger", base, "POST", "/trigger", body)
+        i += 1
+
+
+def preview_client(base, stop, camera, out):
+    u = urllib.parse.urlsplit(base)
+    path = "/preview" + (f"?camera={camera}" if camera else "")
+    res = {"camera": camera, "frames": 0, "first_frame_ms": None, "fps": 0.0, "error": None}
+    out.append(res)
+
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=10)
+    try:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        tail = b""
+        while not stop.is_set():
+            chunk = resp.read1(65536)
+            if not chunk:
+                break
+            buf = tail + chunk
+            n = buf.count(b"--frame")
+            if n and res["first_frame_ms"] is None:
+                res["first_frame_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+            res["frames"] += n
+            # Keep one byte short of a marker so a split one is counted once.
+            tail = buf[-6:]
+    except Exception as e:
+        res["error"] = str(e)
+    finally:
+        conn.close()
+        elapsed = time.perf_counter() - started
+        res["fps"] = round(res["frames"] / elapsed, 2) if elapsed > 0 else 0.0
+
+
+def sampler(base, stop, interval, samples, smtp):
+    t0 = time.time()
+    while True:
+        try:
+            _, _, data = request(base, "GET", "/metrics", timeout=10)
+            m = json.loads(data)
+        except Exception:
+            m = {}
+        proc = m.get("process") or {}
+        samples.append({
+            "t": round(time.time() - t0, 1),
+            "rss_mb": proc.get("rss_mb"),
+            "threads": proc.get("threads"),
+            "recognition": m.get("recognition"),
+            "quality": m.get("quality"),
+            "emails": smtp.messages if smtp is not None else None,
+        })
+        if stop.wait(interval):
+            return
+
+
+# --- report ------------------------------------------------------------------
+
+def git_rev() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def event_counts(workdir):
+    if workdir is None:
+        return None
+    try:
+        conn = sqlite3.connect(os.path.join(workdir, "smartdoor.db"))
+        rows = conn.execute("SELECT result, COUNT(*) FROM events GROUP BY result").fetchall()
+        conn.close()
+        return dict(rows)
+    except sqlite3.Error:
+        return None
+
+
+def build_report(args, duration, stats, previews, samples, smtp, events=None) -> dict:
+    http_stats = {}
+    for name, values in sorted(stats.latency.items()):
+        http_stats[name] = dict(
+            count=len(values),
+            errors=stats.errors.get(name, 0),
+            rps=round(len(values) / duration, 2),
+            **percentiles(values),
+        )
+
+    # Skip the first 10% of samples so start-up allocation is not counted as growth.
+    steady = samples[len(samples) // 10:] or samples
+    rss = [s["rss_mb"] for s in steady if s["rss_mb"] is not None]
+    threads = [s["threads"] for s in samples if s["threads"] is not None]
+    last = samples[-1] if samples else {}
+
+    return {
+        "meta": {
+            "version": git_rev(),
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(time.time() - duration)),
+            "duration_sec": round(duration, 1),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("compare",)},
+        },
+        "http": http_stats,
+        "preview": previews,
+        "preview_fps": percentiles([p["fps"] for p in previews]),
+        "recognition": last.get("recognition"),
+        "quality": last.get("quality"),
+        "emails": smtp.messages if smtp is not None else None,
+        "events": events,
+        "soak": {
+            "rss_start_mb": rss[0] if rss else None,
+            "rss_end_mb": rss[-1] if rss else None,
+            "rss_growth_mb": round(rss[-1] - rss[0], 1) if rss else None,
+            "threads_start": threads[0] if threads else None,
+            "threads_end": threads[-1] if threads else None,
+            "threads_max": max(threads) if threads else None,
+        },
+        "samples": samples,
+    }
+
+
+def print_report(r: dict):
+    meta = r["meta"]
+    print(f"\nSmart Door load test  version={meta['version']}  duration={meta['duration_sec']}s")
+    print(f"{'endpoint':<20}{'count':>8}{'err':>6}{'rps':>8}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+    for name, s in r["http"].items():
+        cols = [str(s[k]) for k in ("p50", "p90", "p99", "max")]
+        print(f"{name:<20}{s['count']:>8}{s['errors']:>6}{s['rps']:>8}" + "".join(f"{c:>9}" for c in cols))
+    print("preview fps per client:", [p["fps"] for p in r["preview"]])
+    rec = r.get("recognition") or {}
+    print("recognition latency ms:", rec.get("latency_ms"), " avg batch:", rec.get("avg_batch"))
+    print("emails sent:", r.get("emails"), " events:", r.get("events"))
+    print("soak:", r["soak"])
+
+
+def compare(old_path: str, new_path: str):
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+
+    def row(label, a, b):
+        delta = ""
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            delta = f"{b - a:+.1f}"
+        print(f"{label:<34}{str(a):>12}{str(b):>12}{delta:>10}")
+
+    print(f"{'':<34}{old['meta']['version']:>12}{new['meta']['version']:>12}{'delta':>10}")
+    for name in sorted(set(old["http"]) | set(new["http"])):
+        a, b = old["http"].get(name, {}), new["http"].get(name, {})
+        for key in ("p50", "p99", "errors"):
+            row(f"{name} {key}", a.get(key), b.get(key))
+    row("preview fps p50", old["preview_fps"]["p50"], new["preview_fps"]["p50"])
+    ra = (old.get("recognition") or {}).get("latency_ms") or {}
+    rb = (new.get("recognition") or {}).get("latency_ms") or {}
+    row("recognition p95 ms", ra.get("p95"), rb.get("p95"))
+    for key in ("rss_growth_mb", "threads_max"):
+        row(f"soak {key}", old["soak"].get(key), new["soak"].get(key))
+
+
+# --- main --------------------------------------------------------------------
+
+def wait_ready(base: str, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            status, _, _ = request(base, "GET", "/status_json", timeout=2)
+            if status == 200:
+                return
+        except Exception:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"App did not become ready at {base}")
+
+
+def run(args):
+    smtp = None
+    child = None
+    workdir = None
+    base = args.url
+
+    if base is None:
+        smtp_port = free_port()
+        smtp = StubSMTPServer(smtp_port)
+        threading.Thread(target=smtp.serve_forever, daemon=True).start()
+
+        port = free_port()
+        workdir = tempfile.mkdtemp(prefix="smartdoor-loadtest-")
+        cmd = [
+            sys.executable, os.path.abspath(__file__), "--serve",
+            "--port", str(port), "--smtp-port", str(smtp_port), "--workdir", workdir,
+            "--cameras", str(args.cameras), "--motion-every", str(args.motion_every),
+        ]
+        if args.overlay:
+            cmd += ["--overlay", os.path.abspath(args.overlay)]
+        log = open(os.path.join(workdir, "app.log"), "w")
+        child = subprocess.Popen(cmd, cwd=BASE_DIR, stdout=log, stderr=subprocess.STDOUT)
+        base = f"http://127.0.0.1:{port}"
+
+    cameras = [f"cam{i}" for i in range(args.cameras)] if args.url is None else []
+
+    try:
+        wait_ready(base)
+        print(f"Load test against {base} for {args.duration}s "
+              f"({args.dashboards} dashboards, {args.previews} previews, trigger every {args.trigger_every}s)")
+
+        stop = threading.Event()
+        stats = Stats()
+        previews = []
+        samples = []
+        threads = [threading.Thread(target=sampler, args=(base, stop, args.sample_every, samples, smtp))]
+        for _ in range(args.dashboards):
+            threads.append(threading.Thread(target=dashboard_client, args=(base, stop, stats, args.poll_every)))
+        for i in range(args.previews):
+            cam = cameras[i % len(cameras)] if cameras else None
+            threads.append(threading.Thread(target=preview_client, args=(base, stop, cam, previews)))
+        if args.trigger_every > 0:
+            threads.append(threading.Thread(target=trigger_client, args=(base, stop, stats, args.trigger_every, cameras)))
+
+        started = time.time()
+        for t in threads:
+            t.daemon = True
+            t.start()
+        stop.wait(args.duration)
+        stop.set()
+        for t in threads:
+            t.join(timeout=15)
+        duration = time.time() - started
+
+        report = build_report(args, duration, stats, previews, samples, smtp, event_counts(workdir))
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print_report(report)
+        print(f"\nReport written to {args.out}")
+    finally:
+        if child is not None:
+            child.terminate()
+            try:
+                child.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                child.kill()
+        if smtp is not None:
+            smtp.shutdown()
+
+
+def main():
+    p = argparse.ArgumentParser(description="Smart Door load and soak test")
+    p.add_argument("--url", help="test a running deployment instead of starting one")
+    p.add_argument("--duration", type=float, default=120.0, help="seconds")
+    p.add_argument("--dashboards", type=int, default=20)
+    p.add_argument("--previews", type=int, default=5)
+    p.add_argument("--poll-every", type=float, default=2.0, help="dashboard /status_json interval")
+    p.add_argument("--trigger-every", type=float, default=5.0, help="manual trigger interval, 0 disables")
+    p.add_argument("--sample-every", type=float, default=5.0, help="/metrics sampling interval")
+    p.add_argument("--cameras", type=int, default=1, help="synthetic cameras")
+    p.add_argument("--motion-every", type=float, default=10.0, help="synthetic motion period")
+    p.add_argument("--overlay", help="image drawn into motion frames, e.g. a face photo")
+    p.add_argument("--out", default="loadtest_report.json")
+    p.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two reports and exit")
+    # Internal: child process running the app under test.
+    p.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    p.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    p.add_argument("--smtp-port", type=int, help=argparse.SUPPRESS)
+    p.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    elif args.serve:
+        serve(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
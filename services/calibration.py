@@ -0,0 +1,117 @@
+import json
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+
+def _distances(hists) -> np.ndarray:
+    # Pairwise HISTCMP_CHISQR_ALT, the distance LBPH uses for predict().
+    # compareHist works on the stored histograms without float temporaries;
+    # the matrix is symmetric, so only the upper triangle is computed.
+    n = len(hists)
+    d = np.zeros((n, n), dtype=np.float64)
+    for i in range(n):
+        for j in range(i + 1, n):
+            d[i, j] = d[j, i] = cv2.compareHist(hists[i], hists[j], cv2.HISTCMP_CHISQR_ALT)
+    np.fill_diagonal(d, np.inf)
+    return d
+
+
+def _far_threshold(impostor: List[float], target_far: float):
+    # Largest threshold that accepts at most target_far of the impostor scores.
+    if not impostor:
+        return None
+    scores = np.sort(np.asarray(impostor, dtype=np.float64))
+    k = int(np.floor(target_far * len(scores)))
+    k = min(k, len(scores) - 1)
+    return float(np.nextafter(scores[k], -np.inf))
+
+
+def _rate(scores: List[float], threshold) -> float:
+    if not scores or threshold is None:
+        return 0.0
+    return float(np.mean(np.asarray(scores) <= threshold))
+
+
+# Leave-one-out calibration over the trained LBPH model. It reuses the
+# histograms stored in the model, so no image is decoded or re-detected.
+# For every sample, the nearest other sample of the same person is a genuine
+# score and the nearest sample of each other person is an impostor score
+# against that person.
+def calibrate(model_path: str, labels_path: str, out_path: str, target_far: float = 0.01) -> Dict:
+    if not Path(model_path).exists() or not Path(labels_path).exists():
+        raise RuntimeError("Model not trained yet")
+
+    with open(labels_path, "r", encoding="utf-8") as f:
+        labels = json.load(f) or {}
+
+    model = cv2.face.LBPHFaceRecognizer_create()
+    model.read(model_path)
+    hists = model.getHistograms()
+    if len(hists) < 2:
+        raise RuntimeError("Not enough training samples")
+
+    hists = [np.ascontiguousarray(h.reshape(-1), dtype=np.float32) for h in hists]
+    y = np.asarray(model.getLabels()).reshape(-1)
+    ids = sorted(set(int(v) for v in y))
+
+    d = _distances(hists)
+    genuine = {}
+    impostor = {}
+    for i in ids:
+        mask = y == i
+        nearest = d[:, mask].min(axis=1)
+        own = nearest[mask]
+        genuine[i] = [float(s) for s in own[np.isfinite(own)]]
+        impostor[i] = [float(s) for s in nearest[~mask]]
+
+    all_genuine = [s for i in ids for s in genuine[i]]
+    all_impostor = [s for i in ids for s in impostor[i]]
+    global_t = _far_threshold(all_impostor, target_far)
+
+    persons = {}
+    stats = {}
+    for i in ids:
+        name = labels.get(str(i))
+        if name is None:
+            continue
+        t = _far_threshold(impostor[i], target_far)
+        stats[name] = {
+            "samples": int((y == i).sum()),
+            "threshold": t,
+            "far": _rate(impostor[i], t),
+            "frr": 1.0 - _rate(genuine[i], t) if genuine[i] and t is not None else None,
+        }
+        if t is not None:
+            persons[name] = t
+
+    result = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "target_far": float(target_far),
+        "global": global_t,
+        "global_far": _rate(all_impostor, global_t),
+        "global_frr": 1.0 - _rate(all_genuine, global_t) if all_genuine and global_t is not None else None,
+        "persons": persons,
+        "stats": stats,
+    }
+
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+
+    from config import CONFIG
+
+    far = float(sys.argv[1]) if len(sys.argv) > 1 else CONFIG.CALIBRATION_TARGET_FAR
+    res = calibrate(CONFIG.MODEL_PATH, CONFIG.LABELS_PATH, CONFIG.THRESHOLDS_PATH, far)
+    print(json.dumps({k: res[k] for k in ("target_far", "global", "global_far", "global_frr")}, indent=2))
+    for name, st in res["stats"].items():
+        print(f"{name}: {st}")
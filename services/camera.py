@@ -2,45 +2,243 @@ import cv2
 import os
 import time
 import threading
+from typing import List, Optional, Union
+
+import numpy as np
 
 class Camera:
-    def __init__(self, index: int = 0):
+    def __init__(
+        self,
+        index: int = 0,
+        width: int = 0,
+        height: int = 0,
+        fps: int = 0,
+        fourcc: str = "",
+        buffer_size: int = 1,
+        grab_latest: bool = True,
+        hw_accel: bool = False,
+        frame_timeout: float = 2.0,
+    ):
         self.index = index
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = int(fps)
+        self.fourcc = (fourcc or "").strip().upper()
+        self.buffer_size = int(buffer_size)
+        self.grab_latest = bool(grab_latest)
+        self.hw_accel = bool(hw_accel)
+        self.frame_timeout = float(frame_timeout)
+
         self.cap = None
         self.lock = threading.Lock()
 
+        # Grab-latest mode: a reader thread keeps only the newest frame.
+        self._frame = None
+        self._frame_seq = 0
+        self._frame_cond = threading.Condition()
+        self._reader = None
+        self._stop = threading.Event()
+
+    def _open_params(self):
+        # Only the FFmpeg backend (stream URLs and files) decodes in hardware;
+        # V4L2 silently ignores the property for USB device indexes.
+        if not self.hw_accel or not isinstance(self.index, str):
+            return []
+        prop = getattr(cv2, "CAP_PROP_HW_ACCELERATION", None)
+        accel = getattr(cv2, "VIDEO_ACCELERATION_ANY", None)
+        if prop is None or accel is None:
+            return []
+        return [prop, accel]
+
+    def _configure(self, cap) -> None:
+        # FOURCC must be set before the size so the driver picks MJPG modes.
+        if len(self.fourcc) == 4:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        if self.width > 0:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        if self.height > 0:
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.fps > 0:
+            cap.set(cv2.CAP_PROP_FPS, self.fps)
+        if self.buffer_size > 0:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+
     def open(self) -> None:
         if self.cap is not None:
             return
 
-        if os.name == "nt":
-            cap = cv2.VideoCapture(self.index, cv2.CAP_DSHOW)
+        if isinstance(self.index, str):
+            # Stream URLs and file paths go through the default backend.
+            api = cv2.CAP_ANY
+        else:
+            api = cv2.CAP_DSHOW if os.name == "nt" else cv2.CAP_V4L2
+        params = self._open_params()
+        if params:
+            cap = cv2.VideoCapture(self.index, api, params)
         else:
-            cap = cv2.VideoCapture(self.index, cv2.CAP_V4L2)
+            cap = cv2.VideoCapture(self.index, api)
 
         if not cap.isOpened():
             cap.release()
             raise RuntimeError(f"Camera open failed (index={self.index})")
 
+        self._configure(cap)
+
         for _ in range(10):
-            cap.read()
+            cap.grab()
             time.sleep(0.03)
 
         self.cap = cap
 
+        if self.grab_latest:
+            self._stop.clear()
+            self._reader = threading.Thread(target=self._reader_loop, daemon=True)
+            self._reader.start()
+
+    def _reader_loop(self) -> None:
+        cap = self.cap
+        while not self._stop.is_set():
+            ok, frame = cap.read()
+            if not ok or frame is None:
+                time.sleep(0.05)
+                continue
+            with self._frame_cond:
+                self._frame = frame
+                self._frame_seq += 1
+                self._frame_cond.notify_all()
+
+    def info(self) -> dict:
+        with self.lock:
+            if self.cap is None:
+                return {}
+            fourcc = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+            info = {
+                "width": int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                "height": int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                "fps": self.cap.get(cv2.CAP_PROP_FPS),
+                "fourcc": "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)),
+                "backend": self.cap.getBackendName(),
+            }
+            prop = getattr(cv2, "CAP_PROP_HW_ACCELERATION", None)
+            if prop is not None:
+                # 0 (VIDEO_ACCELERATION_NONE) means software decoding.
+                info["hw_accel"] = int(self.cap.get(prop))
+            return info
+
     def close(self) -> None:
         with self.lock:
+            self._stop.set()
+            if self._reader is not None:
+                self._reader.join(timeout=1.0)
+                self._reader = None
             if self.cap is not None:
                 self.cap.release()
                 self.cap = None
+            with self._frame_cond:
+                self._frame = None
+
+    def _latest_frame(self, after_seq: Optional[int] = None):
+        deadline = time.time() + self.frame_timeout
+        with self._frame_cond:
+            while self._frame is None or (after_seq is not None and self._frame_seq <= after_seq):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise RuntimeError("Camera frame capture failed")
+                self._frame_cond.wait(remaining)
+            return self._frame, self._frame_seq
 
+    # In grab-latest mode the returned frame is shared between consumers
+    # and must be treated as read-only.
     def capture_frame(self):
+        frame, _ = self.capture_next()
+        return frame
+
+    # Block until a frame newer than after_seq is available; returns (frame, seq).
+    def capture_next(self, after_seq: Optional[int] = None):
         with self.lock:
             if self.cap is None:
                 self.open()
 
-            ok, frame = self.cap.read()
-            if not ok or frame is None:
-                raise RuntimeError("Camera frame capture failed")
+            if not self.grab_latest:
+                ok, frame = self.cap.read()
+                if not ok or frame is None:
+                    raise RuntimeError("Camera frame capture failed")
+                self._frame_seq += 1
+                return frame, self._frame_seq
+
+        return self._latest_frame(after_seq)
+
+
+class SyntheticCamera:
+    # Drop-in Camera replacement that renders frames instead of reading a
+    # device: a drifting background plus a block that sweeps across the
+    # scene for motion_sec out of every motion_every_sec seconds. An optional
+    # overlay image (e.g. a face photo) is drawn instead of the block; given a
+    # list, each motion pass uses the next image. Used for load tests and for
+    # running without a webcam ("synthetic://" sources).
+    def __init__(self, width: int = 640, height: int = 480, fps: int = 15,
+                 motion_every_sec: float = 10.0, motion_sec: float = 2.0,
+                 overlay: Union[str, List[str], None] = None):
+        self.width = int(width) or 640
+        self.height = int(height) or 480
+        self.fps = max(1, int(fps) or 15)
+        self.motion_every_sec = float(motion_every_sec)
+        self.motion_sec = float(motion_sec)
+
+        self.overlays = []
+        for path in ([overlay] if isinstance(overlay, str) else overlay or []):
+            img = cv2.imread(path)
+            if img is None:
+                raise RuntimeError(f"Overlay image not readable: {path}")
+            size = self.height // 2
+            self.overlays.append(cv2.resize(img, (size, size), interpolation=cv2.INTER_AREA))
+
+        self._start = time.time()
+        self._lock = threading.Lock()
+        self._frame = None
+        self._seq = 0
+        self._frame_ts = 0.0
+
+    def _render(self, t: float):
+        frame = np.full((self.height, self.width, 3), 90, dtype=np.uint8)
+        shade = int(20 * np.sin(t / 5.0))
+        frame[:, :, 1] = np.uint8(90 + shade)
+        cv2.putText(frame, time.strftime("%H:%M:%S"), (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+
+        phase = t % self.motion_every_sec if self.motion_every_sec > 0 else self.motion_sec + 1
+        if phase < self.motion_sec:
+            overlay = None
+            if self.overlays:
+                overlay = self.overlays[int(t // self.motion_every_sec) % len(self.overlays)]
+            size = overlay.shape[0] if overlay is not None else self.height // 3
+            x = int((phase / self.motion_sec) * (self.width - size))
+            y = (self.height - size) // 2
+            if overlay is not None:
+                frame[y:y + size, x:x + size] = overlay
+            else:
+                cv2.rectangle(frame, (x, y), (x + size, y + size), (30, 30, 200), -1)
+        return frame
+
+    def info(self) -> dict:
+        return {"width": self.width, "height": self.height, "fps": self.fps, "fourcc": "SYNT"}
+
+    def close(self) -> None:
+        pass
+
+    def capture_frame(self):
+        frame, _ = self.capture_next()
+        return frame
 
-            return frame.copy()
+    def capture_next(self, after_seq: Optional[int] = None):
+        interval = 1.0 / self.fps
+        while True:
+            with self._lock:
+                now = time.time()
+                if self._frame is None or now - self._frame_ts >= interval:
+                    self._frame = self._render(now - self._start)
+                    self._seq += 1
+                    self._frame_ts = now
+                if after_seq is None or self._seq > after_seq:
+                    return self._frame, self._seq
+                wait = interval - (now - self._frame_ts)
+            time.sleep(max(0.001, wait))
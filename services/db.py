@@ -1,5 +1,5 @@
 import sqlite3
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Set
 from datetime import datetime
 
 class DB:
@@ -8,7 +8,7 @@ class DB:
         self._init_db()
 
     def _connect(self):
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
         conn.row_factory = sqlite3.Row
         return conn
 
@@ -16,6 +16,9 @@ class DB:
         conn = self._connect()
         cur = conn.cursor()
 
+        # WAL lets the web workers read while the vision process writes.
+        cur.execute("PRAGMA journal_mode=WAL")
+
         cur.execute("""
         CREATE TABLE IF NOT EXISTS events (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -23,10 +26,18 @@ class DB:
             name TEXT,
             result TEXT NOT NULL,
             confidence REAL,
-            note TEXT
+            note TEXT,
+            clip TEXT,
+            snapshot TEXT,
+            camera TEXT
         )
         """)
 
+        cols = {r["name"] for r in cur.execute("PRAGMA table_info(events)").fetchall()}
+        for col in ("clip", "snapshot", "camera"):
+            if col not in cols:
+                cur.execute(f"ALTER TABLE events ADD COLUMN {col} TEXT")
+
         cur.execute("""
         CREATE TABLE IF NOT EXISTS settings (
             key TEXT PRIMARY KEY,
@@ -55,17 +66,56 @@ class DB:
         conn.close()
         return row["value"] if row else (default if default is not None else "")
 
-    def add_event(self, name: Optional[str], result: str, confidence: Optional[float], note: str = ""):
+    def add_event(
+        self,
+        name: Optional[str],
+        result: str,
+        confidence: Optional[float],
+        note: str = "",
+        snapshot: Optional[str] = None,
+        camera: Optional[str] = None,
+    ) -> int:
         conn = self._connect()
         cur = conn.cursor()
         ts = datetime.now().isoformat(timespec="seconds")
         cur.execute(
-            "INSERT INTO events(ts, name, result, confidence, note) VALUES(?,?,?,?,?)",
-            (ts, name, result, confidence, note)
+            "INSERT INTO events(ts, name, result, confidence, note, snapshot, camera) VALUES(?,?,?,?,?,?,?)",
+            (ts, name, result, confidence, note, snapshot, camera)
         )
+        event_id = cur.lastrowid
+        conn.commit()
+        conn.close()
+        return event_id
+
+    def set_event_clip(self, event_id: int, clip: Optional[str]):
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute("UPDATE events SET clip=? WHERE id=?", (clip, event_id))
+        conn.commit()
+        conn.close()
+
+    def clear_clip(self, clip: str):
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute("UPDATE events SET clip=NULL WHERE clip=?", (clip,))
+        conn.commit()
+        conn.close()
+
+    def clear_snapshot(self, snapshot: str):
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute("UPDATE events SET snapshot=NULL WHERE snapshot=?", (snapshot,))
         conn.commit()
         conn.close()
 
+    def snapshot_keys(self) -> Set[str]:
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute("SELECT DISTINCT snapshot FROM events WHERE snapshot IS NOT NULL")
+        rows = cur.fetchall()
+        conn.close()
+        return {r[0] for r in rows}
+
     def latest_events(self, limit: int = 30) -> List[Dict[str, Any]]:
         conn = self._connect()
         cur = conn.cursor()
@@ -75,6 +125,8 @@ class DB:
         return [dict(r) for r in rows]
     
     def clear_events(self):
-        cur = self.conn.cursor()
+        conn = self._connect()
+        cur = conn.cursor()
         cur.execute("DELETE FROM events")
-        self.conn.commit()
+        conn.commit()
+        conn.close()
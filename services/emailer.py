@@ -3,13 +3,14 @@ from email.message import EmailMessage
 from typing import Optional
 
 class Emailer:
-    def __init__(self, host, port, username, password, email_from, email_to):
+    def __init__(self, host, port, username, password, email_from, email_to, use_tls: bool = True):
         self.host = host
         self.port = port
         self.username = username
         self.password = password
         self.email_from = email_from
         self.email_to = email_to
+        self.use_tls = use_tls
 
     def send(self, subject: str, body: str, image_jpg_bytes: Optional[bytes] = None):
         msg = EmailMessage()
@@ -28,8 +29,9 @@ class Emailer:
 
         with smtplib.SMTP(self.host, self.port, timeout=20) as s:
             s.ehlo()
-            s.starttls()
-            s.ehlo()
+            if self.use_tls:
+                s.starttls()
+                s.ehlo()
             s.login(self.username, self.password)
             s.send_message(msg)
 
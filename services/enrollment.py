@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from services.face_recognizer import FACE_CROP_SUFFIX
+
+
+def sharpness(gray) -> float:
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def symmetry(gray) -> float:
+    # Frontal faces are roughly mirror-symmetric; turned heads are not.
+    h, w = gray.shape[:2]
+    half = w // 2
+    if half == 0:
+        return 0.0
+    left = gray[:, :half]
+    right = cv2.flip(gray[:, w - half:], 1)
+    diff = cv2.absdiff(left, right)
+    return max(0.0, 1.0 - float(diff.mean()) / 128.0)
+
+
+def dhash(gray, size: int = 8) -> int:
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class EnrollmentManager:
+    def __init__(
+        self,
+        camera,
+        faces_dir: str,
+        roi_size: int = 200,
+        min_sharpness: float = 60.0,
+        min_symmetry: float = 0.5,
+        dup_distance: int = 6,
+        detect_width: int = 320,
+        cache=None,
+    ):
+        self.camera = camera
+        self.faces_dir = faces_dir
+        self.roi_size = int(roi_size)
+        self.min_sharpness = float(min_sharpness)
+        self.min_symmetry = float(min_symmetry)
+        self.dup_distance = int(dup_distance)
+        self.detect_width = int(detect_width)
+        self.cache = cache
+
+        self.face_cascade = cv2.CascadeClassifier(
+            cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+        )
+
+        self._lock = threading.Lock()
+        self._job = None
+        self._next_id = 1
+
+    def status(self) -> Optional[dict]:
+        with self._lock:
+            return dict(self._job) if self._job else None
+
+    def start(self, person_name: str, num_samples: int, camera=None) -> int:
+        person_name = (person_name or "").strip()
+        if not person_name:
+            raise ValueError("Person name required")
+        if os.sep in person_name or (os.altsep and os.altsep in person_name) or person_name in (".", ".."):
+            raise ValueError("Invalid person name")
+
+        with self._lock:
+            if self._job and self._job["state"] == "running":
+                raise RuntimeError(f"Enrollment already running for {self._job['person']}")
+            job_id = self._next_id
+            self._next_id += 1
+            self._job = {
+                "id": job_id,
+                "person": person_name,
+                "state": "running",
+                "target": int(num_samples),
+                "saved": 0,
+                "attempts": 0,
+                "no_face": 0,
+                "blurry": 0,
+                "pose": 0,
+                "duplicate": 0,
+                "error": None,
+            }
+
+        threading.Thread(
+            target=self._run, args=(camera or self.camera, person_name, int(num_samples)), daemon=True
+        ).start()
+        return job_id
+
+    def _update(self, **changes) -> None:
+        with self._lock:
+            self._job.update(changes)
+
+    def _bump(self, key: str) -> None:
+        with self._lock:
+            self._job[key] += 1
+
+    def _existing_hashes(self, save_dir: str):
+        hashes = []
+        for name in os.listdir(save_dir):
+            img = cv2.imread(os.path.join(save_dir, name), cv2.IMREAD_GRAYSCALE)
+            if img is not None:
+                hashes.append(dhash(img))
+        return hashes
+
+    def _largest_face(self, gray):
+        h, w = gray.shape[:2]
+        scale = 1.0
+        small = gray
+        if 0 < self.detect_width < w:
+            scale = self.detect_width / float(w)
+            small = cv2.resize(gray, (self.detect_width, int(h * scale)), interpolation=cv2.INTER_AREA)
+
+        min_side = max(20, int(80 * scale))
+        faces = self.face_cascade.detectMultiScale(small, 1.2, 5, minSize=(min_side, min_side))
+        if len(faces) == 0:
+            return None
+
+        x, y, fw, fh = max(faces, key=lambda r: r[2] * r[3])
+        inv = 1.0 / scale
+        return int(x * inv), int(y * inv), int(fw * inv), int(fh * inv)
+
+    def _run(self, camera, person_name: str, num_samples: int) -> None:
+        try:
+            save_dir = os.path.join(self.faces_dir, person_name)
+            os.makedirs(save_dir, exist_ok=True)
+            if self.cache is not None:
+                self.cache.add_person(person_name)
+            hashes = self._existing_hashes(save_dir)
+
+            saved = 0
+            attempts = 0
+            last_seq = None
+
+            while saved < num_samples and attempts < num_samples * 8:
+                attempts += 1
+                self._update(attempts=attempts)
+
+                frame, last_seq = camera.capture_next(last_seq)
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+                rect = self._largest_face(gray)
+                if rect is None:
+                    self._bump("no_face")
+                    time.sleep(0.08)
+                    continue
+
+                x, y, w, h = rect
+                roi = cv2.resize(gray[y:y + h, x:x + w], (self.roi_size, self.roi_size), interpolation=cv2.INTER_AREA)
+
+                if sharpness(roi) < self.min_sharpness:
+                    self._bump("blurry")
+                    continue
+                if symmetry(cv2.equalizeHist(roi)) < self.min_symmetry:
+                    self._bump("pose")
+                    continue
+
+                h_roi = dhash(roi)
+                if any(hamming(h_roi, other) <= self.dup_distance for other in hashes):
+                    self._bump("duplicate")
+                    time.sleep(0.08)
+                    continue
+
+                # The crop already is the face; training uses it as-is.
+                path = os.path.join(save_dir, f"{int(time.time()*1000)}_{saved}{FACE_CROP_SUFFIX}")
+                cv2.imwrite(path, roi)
+                hashes.append(h_roi)
+                saved += 1
+                self._update(saved=saved)
+                time.sleep(0.08)
+
+            if saved == 0:
+                raise RuntimeError("No face samples captured")
+
+            self._update(state="done")
+        except Exception as e:
+            self._update(state="failed", error=str(e))
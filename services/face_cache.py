@@ -0,0 +1,162 @@
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+
+class FaceCache:
+    # Maps every enrolled sample (relative path, mtime, size, SHA-1) to its
+    # cropped grayscale face ROI, so training only decodes and runs Haar on
+    # files that are new or changed. A NULL roi records "no face found".
+    # Every cached roi is exactly what extract() returned for that file.
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS samples (
+            path TEXT PRIMARY KEY,
+            person TEXT NOT NULL,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL,
+            sha1 TEXT NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            roi BLOB
+        )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_samples_sha1 ON samples(sha1)")
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS persons (
+            name TEXT PRIMARY KEY
+        )
+        """)
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _pack(roi) -> Tuple[Optional[int], Optional[int], Optional[bytes]]:
+        if roi is None:
+            return None, None, None
+        roi = np.ascontiguousarray(roi, dtype=np.uint8)
+        return int(roi.shape[1]), int(roi.shape[0]), roi.tobytes()
+
+    @staticmethod
+    def _unpack(row):
+        if row["roi"] is None:
+            return None
+        return np.frombuffer(row["roi"], dtype=np.uint8).reshape(row["height"], row["width"])
+
+    def persons(self) -> List[str]:
+        conn = self._connect()
+        rows = conn.execute("SELECT name FROM persons ORDER BY name").fetchall()
+        conn.close()
+        return [r["name"] for r in rows]
+
+    def add_person(self, name: str):
+        conn = self._connect()
+        conn.execute("INSERT OR IGNORE INTO persons(name) VALUES(?)", (name,))
+        conn.commit()
+        conn.close()
+
+    def delete_person(self, name: str):
+        conn = self._connect()
+        conn.execute("DELETE FROM persons WHERE name=?", (name,))
+        conn.execute("DELETE FROM samples WHERE person=?", (name,))
+        conn.commit()
+        conn.close()
+
+    def seed_persons(self, faces_dir: str):
+        # One-off import for installs that enrolled people before the cache existed.
+        if self.persons() or not os.path.isdir(faces_dir):
+            return
+        for d in os.listdir(faces_dir):
+            if os.path.isdir(os.path.join(faces_dir, d)):
+                self.add_person(d)
+
+    @staticmethod
+    def _content_key(path: str, sha1: str):
+        # extract() may treat files differently by name suffix (pre-cropped
+        # samples), so identical bytes are only shared between like names.
+        return sha1, "".join(Path(path).suffixes).lower()
+
+    def sync(self, faces_dir: str, extract: Callable[[str, bytes], Optional[np.ndarray]]):
+        # Returns ([(person, roi or None), ...], stats) for every file under
+        # faces_dir, extracting only files whose mtime/size or content changed.
+        # Extraction can take minutes on a large folder, so it runs without a
+        # write transaction; all changes are written in one short one at the end.
+        faces_path = Path(faces_dir)
+        conn = self._connect()
+        by_path = {r["path"]: r for r in conn.execute("SELECT * FROM samples").fetchall()}
+        conn.close()
+        by_content = {self._content_key(r["path"], r["sha1"]): r for r in by_path.values()}
+
+        samples = []
+        rows = []
+        seen = set()
+        stats = {"cached": 0, "rehashed": 0, "extracted": 0, "removed": 0}
+        persons = []
+
+        for person_dir in sorted([p for p in faces_path.iterdir() if p.is_dir()]):
+            person = person_dir.name
+            persons.append(person)
+
+            for img_path in person_dir.glob("*.*"):
+                rel = img_path.relative_to(faces_path).as_posix()
+                seen.add(rel)
+                st = img_path.stat()
+
+                row = by_path.get(rel)
+                if row is not None and row["mtime"] == st.st_mtime and row["size"] == st.st_size and row["person"] == person:
+                    samples.append((person, self._unpack(row)))
+                    stats["cached"] += 1
+                    continue
+
+                data = img_path.read_bytes()
+                sha1 = hashlib.sha1(data).hexdigest()
+                match = by_content.get(self._content_key(rel, sha1))
+                if match is not None:
+                    roi = self._unpack(match)
+                    stats["rehashed"] += 1
+                else:
+                    roi = extract(img_path.name, data)
+                    stats["extracted"] += 1
+
+                w, h, blob = self._pack(roi)
+                rows.append((rel, person, st.st_mtime, st.st_size, sha1, w, h, blob))
+                samples.append((person, roi))
+
+        stale = [p for p in by_path if p not in seen]
+        stats["removed"] = len(stale)
+
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.executemany(
+            "INSERT OR REPLACE INTO samples(path, person, mtime, size, sha1, width, height, roi) VALUES(?,?,?,?,?,?,?,?)",
+            rows
+        )
+        cur.executemany("DELETE FROM samples WHERE path=?", [(p,) for p in stale])
+
+        # Persons added while extraction ran (their folder is newer than the
+        # scan) are kept; only persons whose folder is gone are dropped.
+        known = [r["name"] for r in cur.execute("SELECT name FROM persons").fetchall()]
+        gone = [n for n in known if n not in persons and not (faces_path / n).is_dir()]
+        cur.executemany("DELETE FROM persons WHERE name=?", [(n,) for n in gone])
+        cur.executemany("INSERT OR IGNORE INTO persons(name) VALUES(?)", [(p,) for p in persons])
+
+        conn.commit()
+        conn.close()
+        return samples, stats
@@ -5,6 +5,11 @@ from pathlib import Path
 from typing import Optional, Tuple
 
 
+# Enrollment saves samples that already are face crops under this suffix;
+# training uses them as-is instead of running Haar on a tight crop.
+FACE_CROP_SUFFIX = ".face.jpg"
+
+
 class FaceRecognizer:
     def __init__(
         self,
@@ -12,9 +17,11 @@ class FaceRecognizer:
         labels_path: str,
         threshold: float = 60.0,
         min_labels_required: int = 1,
+        thresholds_path: Optional[str] = None,
     ):
         self.model_path = model_path
         self.labels_path = labels_path
+        self.thresholds_path = thresholds_path
         self.threshold = float(threshold)
         self.min_labels_required = int(min_labels_required)
 
@@ -24,6 +31,7 @@ class FaceRecognizer:
 
         self.recognizer = cv2.face.LBPHFaceRecognizer_create()
         self.labels = {}
+        self.person_thresholds = {}
         self._load()
 
     def _load(self):
@@ -36,24 +44,38 @@ class FaceRecognizer:
         if Path(self.model_path).exists():
             self.recognizer.read(self.model_path)
 
+        # Calibrated per-person thresholds override the global one.
+        self.person_thresholds = {}
+        if self.thresholds_path and Path(self.thresholds_path).exists():
+            with open(self.thresholds_path, "r", encoding="utf-8") as f:
+                data = json.load(f) or {}
+            self.person_thresholds = {k: float(v) for k, v in (data.get("persons") or {}).items()}
+
     def set_threshold(self, value: float):
         self.threshold = float(value)
 
-    def detect_and_recognize(self, frame) -> Tuple[str, Optional[str], Optional[float], str]:
-
+    def detect_roi(self, frame, face=None, cascade=None):
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         gray = cv2.equalizeHist(gray)
 
-        faces = self.face_cascade.detectMultiScale(
-            gray, scaleFactor=1.2, minNeighbors=5, minSize=(80, 80)
-        )
+        # A face rectangle from an earlier stage skips the Haar pass.
+        if face is None:
+            faces = (cascade or self.face_cascade).detectMultiScale(
+                gray, scaleFactor=1.2, minNeighbors=5, minSize=(80, 80)
+            )
 
-        if len(faces) == 0:
-            return "NO_FACE", None, None, "No face detected"
+            if len(faces) == 0:
+                return None
+
+            faces = sorted(faces, key=lambda r: r[2] * r[3], reverse=True)
+            face = faces[0]
 
-        faces = sorted(faces, key=lambda r: r[2] * r[3], reverse=True)
-        (x, y, w, h) = faces[0]
-        roi = gray[y:y + h, x:x + w]
+        (x, y, w, h) = face
+        return gray[y:y + h, x:x + w]
+
+    def classify(self, roi, threshold: Optional[float] = None) -> Tuple[str, Optional[str], Optional[float], str]:
+        if threshold is None:
+            threshold = self.threshold
 
         if len(self.labels) < self.min_labels_required:
             return "DENIED", None, None, f"Insufficient trained persons ({len(self.labels)})"
@@ -64,15 +86,22 @@ class FaceRecognizer:
             return "DENIED", None, None, "Model not trained yet"
 
         name = self.labels.get(str(label_id), None)
+        threshold = self.person_thresholds.get(name, threshold)
 
-        if confidence <= self.threshold and name is not None:
+        if confidence <= threshold and name is not None:
            return "GRANTED", name, float(confidence), "Match"
         
         return "DENIED", None, float(confidence), "Unknown or above threshold"
 
+    def detect_and_recognize(self, frame, face=None) -> Tuple[str, Optional[str], Optional[float], str]:
+        roi = self.detect_roi(frame, face=face)
+        if roi is None:
+            return "NO_FACE", None, None, "No face detected"
+        return self.classify(roi)
+
 
     @staticmethod
-    def train_from_folder(faces_dir: str, model_path: str, labels_path: str) -> Tuple[int, int]:
+    def train_from_folder(faces_dir: str, model_path: str, labels_path: str, cache=None) -> Tuple[int, int]:
         faces_path = Path(faces_dir)
         if not faces_path.exists():
             raise RuntimeError("faces_dir does not exist")
@@ -82,6 +111,32 @@ class FaceRecognizer:
         )
         recognizer = cv2.face.LBPHFaceRecognizer_create()
 
+        def extract(name: str, data: bytes):
+            img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                return None
+
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            if name.endswith(FACE_CROP_SUFFIX):
+                return gray
+
+            faces = face_cascade.detectMultiScale(gray, 1.2, 5, minSize=(80, 80))
+            if len(faces) == 0:
+                return None
+
+            faces = sorted(faces, key=lambda r: r[2] * r[3], reverse=True)
+            x, y0, w, h = faces[0]
+            return gray[y0:y0 + h, x:x + w]
+
+        if cache is not None:
+            samples, _ = cache.sync(faces_dir, extract)
+        else:
+            samples = [
+                (person_dir.name, extract(img_path.name, img_path.read_bytes()))
+                for person_dir in sorted([p for p in faces_path.iterdir() if p.is_dir()])
+                for img_path in person_dir.glob("*.*")
+            ]
+
         X = []
         y = []
         labels = {}
@@ -98,24 +153,14 @@ class FaceRecognizer:
                 labels[str(next_id)] = person
                 next_id += 1
 
-            for img_path in person_dir.glob("*.*"):
-                total_imgs += 1
-                img = cv2.imread(str(img_path))
-                if img is None:
-                    continue
-
-                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                faces = face_cascade.detectMultiScale(gray, 1.2, 5, minSize=(80, 80))
-                if len(faces) == 0:
-                    continue
-
-                faces = sorted(faces, key=lambda r: r[2] * r[3], reverse=True)
-                x, y0, w, h = faces[0]
-                roi = gray[y0:y0 + h, x:x + w]
+        for person, roi in samples:
+            total_imgs += 1
+            if roi is None:
+                continue
 
-                X.append(roi)
-                y.append(label_to_id[person])
-                used_faces += 1
+            X.append(roi)
+            y.append(label_to_id[person])
+            used_faces += 1
 
         if used_faces < 2:
             raise RuntimeError("Not enough training samples")
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import cv2
+
+from services.MotionDetector import MotionDetector
+
+
+class CameraPipeline:
+    def __init__(self, camera_id: str, camera, quality_gate=None, recorder=None, motion_area: int = 2500):
+        self.id = camera_id
+        self.camera = camera
+        self.quality_gate = quality_gate
+        self.recorder = recorder
+        self.motion_area = motion_area
+        self.motion_detector = None
+
+        self.status_lock = threading.Lock()
+        self.status = {
+            "camera": "standby",
+            "last_result": "N/A",
+            "last_name": None,
+            "last_confidence": None,
+            "note": "",
+            "updated": 0.0,
+        }
+
+        # Email cooldown is per door; the lock makes check-send-mark atomic.
+        self.email_lock = threading.Lock()
+        self.last_email_sent_ts = 0.0
+
+        self._preview_lock = threading.Lock()
+        self._preview_seq = None
+        self._preview_jpg = None
+
+    def warm_up(self) -> bool:
+        try:
+            detector = MotionDetector(area_threshold=self.motion_area)
+            detector.detect(self.camera.capture_frame())
+            print(f"Camera {self.id}:", self.camera.info())
+            self.motion_detector = detector
+            return True
+        except Exception as e:
+            print(f"Motion disabled for camera {self.id}:", e)
+            self.motion_detector = None
+            return False
+
+    def get_status(self) -> dict:
+        with self.status_lock:
+            return dict(self.status)
+
+    def set_status(self, **changes) -> None:
+        with self.status_lock:
+            self.status.update(changes)
+            self.status["updated"] = time.time()
+
+    def latest_preview_jpeg(self, after_seq=None):
+        # Encode each camera frame at most once, however many viewers are open.
+        frame, seq = self.camera.capture_next(after_seq)
+        with self._preview_lock:
+            if self._preview_seq != seq:
+                ok, buffer = cv2.imencode(".jpg", frame)
+                if not ok:
+                    raise RuntimeError("Preview encode failed")
+                self._preview_seq = seq
+                self._preview_jpg = buffer.tobytes()
+            return self._preview_jpg, seq
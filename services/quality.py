@@ -0,0 +1,79 @@
+import threading
+from typing import Optional, Tuple
+
+import cv2
+
+REASONS = ("dark", "bright", "blurry", "no_face", "small_face")
+
+
+class FrameQualityGate:
+    def __init__(
+        self,
+        width: int = 320,
+        min_brightness: float = 40.0,
+        max_brightness: float = 220.0,
+        min_sharpness: float = 30.0,
+        min_face: int = 80,
+    ):
+        self.width = int(width)
+        self.min_brightness = float(min_brightness)
+        self.max_brightness = float(max_brightness)
+        self.min_sharpness = float(min_sharpness)
+        self.min_face = int(min_face)
+
+        self.face_cascade = cv2.CascadeClassifier(
+            cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+        )
+
+        self._lock = threading.Lock()
+        self._counts = {"checked": 0, "passed": 0, "expired": 0}
+        for reason in REASONS:
+            self._counts[f"skipped_{reason}"] = 0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def _result(self, reason: Optional[str], face=None):
+        self.count("passed" if reason is None else f"skipped_{reason}")
+        return reason is None, reason, face
+
+    # Returns (ok, reason, face) where face is the largest face rectangle in
+    # full-frame coordinates, so the recognizer can skip its own Haar pass.
+    def check(self, frame) -> Tuple[bool, Optional[str], Optional[Tuple[int, int, int, int]]]:
+        self.count("checked")
+
+        h, w = frame.shape[:2]
+        scale = 1.0
+        if 0 < self.width < w:
+            scale = self.width / float(w)
+            frame = cv2.resize(frame, (self.width, max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        brightness = float(gray.mean())
+        if brightness < self.min_brightness:
+            return self._result("dark")
+        if brightness > self.max_brightness:
+            return self._result("bright")
+
+        if float(cv2.Laplacian(gray, cv2.CV_64F).var()) < self.min_sharpness:
+            return self._result("blurry")
+
+        min_side = max(16, int(self.min_face * scale * 0.75))
+        faces = self.face_cascade.detectMultiScale(
+            cv2.equalizeHist(gray), scaleFactor=1.2, minNeighbors=5, minSize=(min_side, min_side)
+        )
+        if len(faces) == 0:
+            return self._result("no_face")
+
+        x, y, fw, fh = max(faces, key=lambda r: r[2] * r[3])
+        inv = 1.0 / scale
+        face = (int(x * inv), int(y * inv), int(fw * inv), int(fh * inv))
+        if min(face[2], face[3]) < self.min_face:
+            return self._result("small_face")
+
+        return self._result(None, face)
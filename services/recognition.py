@@ -0,0 +1,147 @@
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+import cv2
+
+from services.face_recognizer import FaceRecognizer
+
+
+class RecognizerService:
+    # Face detection runs on the caller's thread; the face ROIs from every
+    # camera and manual trigger are queued and classified on a worker pool,
+    # with results coming back through futures. LBPH predict() has no work
+    # to share between queries, so a batch is a dispatch round rather than
+    # one vectorised call: while workers are idle the dispatcher hands each
+    # of them a queued ROI at once (up to max_batch per round), and only when
+    # all are busy does it wait, at most max_wait_ms, for one to free up.
+    # Handing out one ROI per worker keeps a long batch from queueing behind
+    # a single worker. The queue is FIFO, so no camera can starve the others.
+    def __init__(
+        self,
+        model_path: str,
+        labels_path: str,
+        threshold: float = 60.0,
+        max_batch: int = 8,
+        max_wait_ms: float = 15.0,
+        workers: int = 2,
+        thresholds_path: Optional[str] = None,
+    ):
+        self.model_path = model_path
+        self.labels_path = labels_path
+        self.thresholds_path = thresholds_path
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.workers = max(1, int(workers))
+
+        self._recognizer = FaceRecognizer(
+            model_path, labels_path, threshold=threshold, thresholds_path=thresholds_path
+        )
+        # CascadeClassifier is not safe to share between threads, and
+        # loading one costs tens of milliseconds, so callers borrow from a
+        # pool that grows to the peak number of concurrent detections.
+        self._cascades = queue.LifoQueue()
+        self._cascades.put(self._new_cascade())
+        self._queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="recognize")
+        self._idle = self.workers
+        self._idle_cond = threading.Condition()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"batches": 0, "items": 0, "max_batch_seen": 0}
+        self._latencies = deque(maxlen=1000)
+
+        threading.Thread(target=self._batch_loop, daemon=True).start()
+
+    @staticmethod
+    def _new_cascade():
+        return cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+
+    @contextmanager
+    def _cascade(self):
+        try:
+            cascade = self._cascades.get_nowait()
+        except queue.Empty:
+            cascade = self._new_cascade()
+        try:
+            yield cascade
+        finally:
+            self._cascades.put(cascade)
+
+    def submit(self, roi, threshold: float) -> Future:
+        fut = Future()
+        self._queue.put((roi, float(threshold), fut))
+        return fut
+
+    def recognize(self, frame, threshold: float, face=None):
+        started = time.monotonic()
+        try:
+            with self._cascade() as cascade:
+                roi = self._recognizer.detect_roi(frame, face=face, cascade=cascade)
+            if roi is None:
+                return "NO_FACE", None, None, "No face detected"
+            return self.submit(roi, threshold).result()
+        finally:
+            with self._stats_lock:
+                self._latencies.append((time.monotonic() - started) * 1000.0)
+
+    def reload(self, threshold: float) -> None:
+        # Batches already dispatched finish on the model they started with.
+        self._recognizer = FaceRecognizer(
+            self.model_path, self.labels_path, threshold=threshold, thresholds_path=self.thresholds_path
+        )
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+            latencies = sorted(self._latencies)
+        if latencies:
+            def pick(q):
+                return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 1)
+
+            stats["latency_ms"] = {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": round(latencies[-1], 1)}
+        else:
+            stats["latency_ms"] = None
+        stats["avg_batch"] = round(stats["items"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    def _batch_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            with self._idle_cond:
+                if self._idle <= 0:
+                    self._idle_cond.wait_for(lambda: self._idle > 0, timeout=self.max_wait)
+                idle = max(1, self._idle)
+            while len(batch) < min(self.max_batch, idle):
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["items"] += len(batch)
+                self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(batch))
+
+            model = self._recognizer
+            for item in batch:
+                with self._idle_cond:
+                    self._idle -= 1
+                self._pool.submit(self._classify, model, *item)
+
+    def _classify(self, model: FaceRecognizer, roi, threshold: float, fut: Future) -> None:
+        try:
+            if fut.set_running_or_notify_cancel():
+                try:
+                    fut.set_result(model.classify(roi, threshold))
+                except Exception as e:
+                    fut.set_exception(e)
+        finally:
+            with self._idle_cond:
+                self._idle += 1
+                self._idle_cond.notify()
@@ -0,0 +1,158 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class ClipRecorder:
+    def __init__(
+        self,
+        camera,
+        clips_dir: str,
+        pre_seconds: float = 4.0,
+        post_seconds: float = 3.0,
+        fps: float = 10.0,
+        scale: float = 0.5,
+        jpeg_quality: int = 80,
+        quota_mb: float = 500.0,
+        fourcc: str = "VP80",
+        extension: str = ".webm",
+        on_saved: Optional[Callable[[int, str], None]] = None,
+        on_evicted: Optional[Callable[[str], None]] = None,
+    ):
+        self.camera = camera
+        self.clips_dir = clips_dir
+        self.pre_seconds = float(pre_seconds)
+        self.post_seconds = float(post_seconds)
+        self.fps = max(1.0, float(fps))
+        self.scale = float(scale)
+        self.jpeg_quality = int(jpeg_quality)
+        self.quota_bytes = int(float(quota_mb) * 1024 * 1024)
+        self.fourcc = fourcc
+        self.extension = extension
+        self.on_saved = on_saved
+        self.on_evicted = on_evicted
+
+        # Ring of (timestamp, jpeg bytes); sized to hold pre + post + slack.
+        maxlen = int((self.pre_seconds + self.post_seconds + 2.0) * self.fps) + 1
+        self._ring = deque(maxlen=maxlen)
+        self._ring_lock = threading.Lock()
+
+        self._jobs = queue.Queue()
+        self._started = False
+
+    def start(self) -> None:
+        if self._started:
+            return
+        self._started = True
+        os.makedirs(self.clips_dir, exist_ok=True)
+        threading.Thread(target=self._sample_loop, daemon=True).start()
+        threading.Thread(target=self._writer_loop, daemon=True).start()
+
+    def trigger(self, event_id: int, label: str = "") -> None:
+        # Never blocks the caller: the writer waits for the post-event window.
+        if not self._started:
+            return
+        self._jobs.put((event_id, label, time.time()))
+
+    def _sample_loop(self) -> None:
+        interval = 1.0 / self.fps
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
+        last_seq = None
+        while True:
+            started = time.time()
+            try:
+                frame, last_seq = self.camera.capture_next(last_seq)
+                if 0 < self.scale < 1.0:
+                    frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+                ok, buf = cv2.imencode(".jpg", frame, params)
+                if ok:
+                    with self._ring_lock:
+                        self._ring.append((started, buf.tobytes()))
+            except Exception:
+                time.sleep(0.5)
+                continue
+            elapsed = time.time() - started
+            if elapsed < interval:
+                time.sleep(interval - elapsed)
+
+    def _snapshot(self, start_ts: float, end_ts: float) -> List[Tuple[float, bytes]]:
+        with self._ring_lock:
+            return [(ts, jpg) for ts, jpg in self._ring if start_ts <= ts <= end_ts]
+
+    def _writer_loop(self) -> None:
+        while True:
+            event_id, label, event_ts = self._jobs.get()
+            try:
+                wait = event_ts + self.post_seconds - time.time()
+                if wait > 0:
+                    time.sleep(wait)
+
+                frames = self._snapshot(event_ts - self.pre_seconds, event_ts + self.post_seconds)
+                path = self._write_clip(event_id, label, event_ts, frames)
+                if path is None:
+                    continue
+
+                self._enforce_quota(keep=path)
+                if self.on_saved is not None:
+                    self.on_saved(event_id, os.path.basename(path))
+            except Exception as e:
+                print("Clip write failed:", e)
+
+    def _write_clip(self, event_id: int, label: str, event_ts: float, frames) -> Optional[str]:
+        if not frames:
+            return None
+
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(event_ts))
+        suffix = f"_{label.lower()}" if label else ""
+        path = os.path.join(self.clips_dir, f"{stamp}_{event_id}{suffix}{self.extension}")
+
+        writer = None
+        try:
+            for _, jpg in frames:
+                img = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if img is None:
+                    continue
+                if writer is None:
+                    h, w = img.shape[:2]
+                    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (w, h))
+                    if not writer.isOpened():
+                        raise RuntimeError(f"VideoWriter open failed ({self.fourcc})")
+                writer.write(img)
+        finally:
+            if writer is not None:
+                writer.release()
+
+        return path if writer is not None else None
+
+    def _enforce_quota(self, keep: Optional[str] = None) -> None:
+        if self.quota_bytes <= 0:
+            return
+
+        entries = []
+        total = 0
+        for name in os.listdir(self.clips_dir):
+            p = os.path.join(self.clips_dir, name)
+            if not os.path.isfile(p):
+                continue
+            st = os.stat(p)
+            entries.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+
+        for _, size, p in sorted(entries):
+            if total <= self.quota_bytes:
+                break
+            if p == keep:
+                continue
+            try:
+                os.remove(p)
+                total -= size
+            except OSError:
+                continue
+            if self.on_evicted is not None:
+                self.on_evicted(os.path.basename(p))
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Callable, Iterable, Optional, Tuple
+
+import cv2
+
+_KEY_RE = re.compile(r"^[0-9a-f]{40}$")
+
+
+class SnapshotStore:
+    def __init__(
+        self,
+        root: str,
+        thumb_width: int = 160,
+        jpeg_quality: int = 85,
+        quota_mb: float = 200.0,
+        on_evicted: Optional[Callable[[str], None]] = None,
+    ):
+        self.root = root
+        self.thumb_width = int(thumb_width)
+        self.jpeg_quality = int(jpeg_quality)
+        self.quota_bytes = int(float(quota_mb) * 1024 * 1024)
+        self.on_evicted = on_evicted
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def valid_key(key: str) -> bool:
+        return bool(_KEY_RE.match(key or ""))
+
+    def path_for(self, key: str, size: str = "full") -> Optional[str]:
+        if not self.valid_key(key):
+            return None
+        suffix = "_thumb" if size == "thumb" else ""
+        return os.path.join(self.root, key[:2], f"{key}{suffix}.jpg")
+
+    def _encode(self, img) -> bytes:
+        ok, buf = cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+        if not ok:
+            raise RuntimeError("JPEG encode failed")
+        return buf.tobytes()
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        # Write to a temp name first so readers never see a partial file.
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def save(self, frame) -> Tuple[str, bytes]:
+        full = self._encode(frame)
+        key = hashlib.sha1(full).hexdigest()
+
+        full_path = self.path_for(key)
+        if os.path.exists(full_path):
+            return key, full
+
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+        h, w = frame.shape[:2]
+        if 0 < self.thumb_width < w:
+            th = max(1, int(h * self.thumb_width / w))
+            thumb = self._encode(cv2.resize(frame, (self.thumb_width, th), interpolation=cv2.INTER_AREA))
+        else:
+            thumb = full
+
+        self._write(self.path_for(key, "thumb"), thumb)
+        self._write(full_path, full)
+        self.enforce_quota(keep=key)
+        return key, full
+
+    def _entries(self):
+        # (mtime, bytes, key) per stored snapshot; full image and thumbnail count together.
+        sizes = {}
+        mtimes = {}
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                key = name[:40]
+                if not name.endswith(".jpg") or not self.valid_key(key):
+                    continue
+                try:
+                    st = os.stat(os.path.join(dirpath, name))
+                except OSError:
+                    continue
+                sizes[key] = sizes.get(key, 0) + st.st_size
+                mtimes[key] = max(mtimes.get(key, 0.0), st.st_mtime)
+        return [(mtimes[k], sizes[k], k) for k in sizes]
+
+    def remove(self, key: str) -> None:
+        for size in ("full", "thumb"):
+            path = self.path_for(key, size)
+            try:
+                if path is not None:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def enforce_quota(self, keep: Optional[str] = None) -> None:
+        if self.quota_bytes <= 0:
+            return
+
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in sorted(entries):
+                if total <= self.quota_bytes:
+                    break
+                if key == keep:
+                    continue
+                try:
+                    self.remove(key)
+                except OSError:
+                    continue
+                total -= size
+                if self.on_evicted is not None:
+                    self.on_evicted(key)
+
+    def prune(self, referenced: Iterable[str], min_age_sec: float = 60.0) -> int:
+        # Remove snapshots no event references. Recent ones are kept: a
+        # snapshot is saved just before its event row is written.
+        referenced = set(referenced)
+        cutoff = time.time() - min_age_sec
+        removed = 0
+        with self._lock:
+            for mtime, _, key in self._entries():
+                if key in referenced or mtime > cutoff:
+                    continue
+                try:
+                    self.remove(key)
+                except OSError:
+                    continue
+                removed += 1
+        return removed
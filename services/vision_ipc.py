@@ -0,0 +1,189 @@
+import os
+import secrets
+import socket
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge
+
+# Calls the web tier may make on the vision process.
+METHODS = (
+    "get_status",
+    "get_metrics",
+    "trigger",
+    "latest_preview_jpeg",
+    "reload_recognizer",
+    "start_enrollment",
+)
+
+# The key that used to ship in config.py; anyone can read it, so refuse it.
+INSECURE_AUTHKEYS = ("change-me",)
+HANDSHAKE_TIMEOUT = 5.0
+
+
+def load_authkey(path: str, configured: str = "") -> bytes:
+    # Messages are pickled, so the key is what keeps other local processes
+    # from running code in the vision process. Without a configured key both
+    # sides share a random one in a 0600 file; whichever starts first creates it.
+    if configured:
+        if configured in INSECURE_AUTHKEYS:
+            raise RuntimeError("VISION_AUTHKEY is the shipped default; set a secret or leave it empty")
+        return configured.encode("utf-8")
+
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            # link() fails if the other side won the race; use its key then.
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
+
+    with open(path, "r", encoding="utf-8") as f:
+        key = f.read().strip()
+    if not key:
+        raise RuntimeError(f"Vision key file is empty: {path}")
+    return key.encode("utf-8")
+
+
+OFFLINE_STATUS = {
+    "camera": "offline",
+    "last_result": "N/A",
+    "last_name": None,
+    "last_confidence": None,
+    "note": "Vision process unreachable",
+}
+
+
+class VisionServer:
+    def __init__(self, target, host: str, port: int, authkey: bytes):
+        self.target = target
+        self.address = (host, int(port))
+        self.authkey = authkey
+
+    def serve_forever(self) -> None:
+        # No authkey on the Listener: its handshake would run on this accept
+        # loop, where one silent client blocks every other connection.
+        with Listener(self.address) as listener:
+            print(f"Vision IPC listening on {self.address[0]}:{self.address[1]}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    print("Vision IPC accept failed:", e)
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _authenticate(self, conn) -> bool:
+        # Shutting down a duplicate of the socket wakes a blocked handshake.
+        sock = socket.socket(fileno=os.dup(conn.fileno()))
+
+        def expire():
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+        timer = threading.Timer(HANDSHAKE_TIMEOUT, expire)
+        timer.start()
+        try:
+            deliver_challenge(conn, self.authkey)
+            answer_challenge(conn, self.authkey)
+            return True
+        except (AuthenticationError, EOFError, OSError):
+            return False
+        finally:
+            timer.cancel()
+            sock.close()
+
+    def _handle(self, conn) -> None:
+        with conn:
+            if not self._authenticate(conn):
+                return
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+
+                if method not in METHODS:
+                    conn.send(("err", f"Unknown method: {method}"))
+                    continue
+
+                try:
+                    value = getattr(self.target, method)(*args, **kwargs)
+                    conn.send(("ok", value))
+                except Exception as e:
+                    conn.send(("err", str(e)))
+
+
+class RemoteVision:
+    def __init__(self, host: str, port: int, authkey: bytes):
+        self.address = (host, int(port))
+        self.authkey = authkey
+        # One connection per web thread; connections are not thread-safe.
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _drop(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _call(self, method: str, *args, **kwargs):
+        # A stale connection (vision process restarted) fails on connect or
+        # send, which is safe to retry once. Once the request is sent it may
+        # already have run, so a failed recv is not retried: repeating
+        # trigger or start_enrollment would run them twice.
+        for attempt in range(2):
+            try:
+                conn = self._conn()
+                conn.send((method, args, kwargs))
+                break
+            except (EOFError, OSError):
+                self._drop()
+                if attempt == 1:
+                    raise
+        try:
+            status, value = conn.recv()
+        except (EOFError, OSError):
+            self._drop()
+            raise
+        if status == "err":
+            raise RuntimeError(value)
+        return value
+
+    def get_status(self) -> dict:
+        try:
+            return self._call("get_status")
+        except (EOFError, OSError):
+            return dict(OFFLINE_STATUS)
+
+    def get_metrics(self) -> dict:
+        return self._call("get_metrics")
+
+    def trigger(self, source: str = "MANUAL", camera_id=None) -> None:
+        self._call("trigger", source, camera_id)
+
+    def latest_preview_jpeg(self, after_seq=None, camera_id=None):
+        return self._call("latest_preview_jpeg", after_seq, camera_id)
+
+    def reload_recognizer(self) -> None:
+        self._call("reload_recognizer")
+
+    def start_enrollment(self, person_name: str, num_samples: int, camera_id=None) -> int:
+        return self._call("start_enrollment", person_name, num_samples, camera_id)
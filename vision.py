@@ -0,0 +1,11 @@
+# Vision process for the production serving mode: owns the camera, motion
+# loop and recognizer, and answers the web workers over a local socket.
+#
+#   python vision.py
+#   gunicorn -w 4 -k gthread --threads 8 -b 0.0.0.0:5000 wsgi:app
+import app as smartdoor
+
+
+if __name__ == "__main__":
+    smartdoor.start_background_threads()
+    smartdoor.serve_vision()
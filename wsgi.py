@@ -0,0 +1,6 @@
+# Web tier entry point for gunicorn (or any WSGI server). The camera and
+# recognizer live in the separate vision process started with vision.py.
+import app as smartdoor
+
+smartdoor.use_remote_vision()
+app = smartdoor.app